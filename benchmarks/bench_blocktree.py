@@ -0,0 +1,61 @@
+"""Benchmarks of fork choice and block creation"""
+import sys
+import numpy as np
+import pytest
+sys.path.append("../")
+import eth_base as sample
+
+pytest.importorskip("pytest_benchmark")
+
+
+def make_blocktree(n_blocks, n_validators=100, seed=0):
+    """A blocktree where each block extends one of the last 3 blocks,
+    and attestations to random blocks among the last 30.
+    """
+    rng = np.random.default_rng(seed)
+    blocks = [sample.Block()]
+    for i in range(1, n_blocks):
+        parent = blocks[max(0, i - 1 - rng.integers(3))]
+        blocks.append(sample.Block(parent=parent, slot_no=i))
+    attestations = {
+        v: (blocks[max(0, n_blocks - 1 - rng.integers(30))], n_blocks)
+        for v in range(n_validators)}
+    return blocks, attestations
+
+
+@pytest.fixture(scope="module", params=[10**3, 10**4, 10**5])
+def blocktree(request):
+    return make_blocktree(request.param)
+
+
+##################
+# benchmarks
+
+def bench_lmd_ghost(benchmark, blocktree):
+    "lmd_ghost on the whole blocktree"
+    blocks, attestations = blocktree
+    head = benchmark(sample.lmd_ghost, blocks, attestations)
+    assert(head.height > 0)
+
+
+def bench_lmd_ghost_table(benchmark, blocktree):
+    "lmd_ghost on the table of the blocktree"
+    blocks, attestations = blocktree
+    benchmark(sample.lmd_ghost, blocks[0].table, attestations)
+
+
+@pytest.mark.parametrize("depth", [10**3, 10**5])
+def bench_block_construction(benchmark, depth):
+    "1000 blocks on top of a chain of depth blocks"
+    chain = [sample.Block()]
+    for i in range(1, depth):
+        chain.append(sample.Block(parent=chain[-1], slot_no=i))
+
+    def build():
+        block = chain[-1]
+        for i in range(1000):
+            block = sample.Block(parent=block, slot_no=depth + i)
+        return block
+
+    block = benchmark(build)
+    assert(block.height == depth + 999)
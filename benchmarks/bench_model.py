@@ -0,0 +1,54 @@
+"""Benchmarks of whole simulations"""
+import sys
+import pytest
+sys.path.append("../")
+import eth_base as sample
+import topology
+
+pytest.importorskip("pytest_benchmark")
+
+# default parameters of ethereum_abm.input, with a slower attestation
+# gossip to keep the runs short
+PARAMETERS = {
+    'no_nodes': 100,
+    'no_neighs': 8,
+    'p_sbm_inter': 0.1,
+    'tree_r': 2,
+    'tau_block': 1.,
+    'tau_attestation': 0.1,
+    'delay_share': 0.5,
+    'delay_time': 2,
+    }
+SIMULATION_TIME = 24
+
+
+def make_model(network_topology, seed=0):
+    parameters = dict(PARAMETERS, network_topology=network_topology)
+    return sample.Model(
+        graph=topology.generate_topology(parameters, seed=seed),
+        tau_block=parameters['tau_block'],
+        tau_attest=parameters['tau_attestation'],
+        delay_share=parameters['delay_share'],
+        delay_time=parameters['delay_time'],
+        seed=seed)
+
+
+##################
+# benchmarks
+
+@pytest.mark.parametrize("network_topology",
+                         ["UNIFORM", "ER", "BA", "SBM", "TREE"])
+def bench_run(benchmark, network_topology):
+    "a simulation on each topology"
+    def setup():
+        return (make_model(network_topology), SIMULATION_TIME), {}
+
+    benchmark.pedantic(sample.Model.run, setup=setup, rounds=3)
+
+
+def bench_results(benchmark):
+    "the metrics of a simulation"
+    model = make_model("ER")
+    model.run(SIMULATION_TIME)
+    results = benchmark(model.results)
+    assert(set(results) == set(sample.DEFAULT_METRICS))
@@ -0,0 +1,48 @@
+"""Benchmarks of the attestation gossip"""
+import sys
+import itertools
+import numpy as np
+import pytest
+import networkx as nx
+sys.path.append("../")
+import eth_base as sample
+
+pytest.importorskip("pytest_benchmark")
+
+
+@pytest.fixture(scope="module", params=[100, 1000])
+def model(request):
+    graph = nx.random_regular_graph(8, request.param, seed=0)
+    model = sample.Model(graph=graph, tau_block=2, tau_attest=1, seed=0)
+    # a chain of blocks known by the first node
+    for _ in range(20):
+        model.nodes[0].propose_block()
+    return model
+
+
+##################
+# benchmarks
+
+def bench_receive_attestations(benchmark, model):
+    "a node receives a view where every attestation is newer"
+    listener = model.nodes[0]
+    blocks = np.arange(len(model.blockchain), dtype=np.int32)
+    rng = np.random.default_rng(0)
+    slots = itertools.count(1)
+
+    def setup():
+        # every round moves all votes to random blocks, with a new slot
+        view = (rng.choice(blocks, size=model.N).astype(np.int32),
+                np.full(model.N, next(slots), dtype=np.int32))
+        return view, {}
+
+    benchmark.pedantic(listener.receive_attestations, setup=setup,
+                       rounds=50)
+
+
+def bench_receive_attestations_synced(benchmark, model):
+    "a node receives its own view, nothing changes"
+    listener = model.nodes[0]
+    blocks = listener.attestation_blocks.copy()
+    slots = listener.attestation_slots.copy()
+    benchmark(listener.receive_attestations, blocks, slots)
@@ -20,7 +20,25 @@ import logging
 import networkx as nx
 import numpy as np
 import math
+import bisect
+import heapq
+import itertools
+import functools
+import collections
+import collections.abc
 import pickle as pkl
+import time
+import os
+try:
+    from scipy.sparse import csgraph
+except ImportError:
+    # scipy is optional, path lengths fall back to networkx
+    csgraph = None
+
+# fingerprints of the nodes views are kept on 64 bits
+FINGERPRINT_MASK = (1 << 64) - 1
+# format of the files written by Model.checkpoint
+CHECKPOINT_VERSION = 1
 
 
 class Process:
@@ -50,34 +68,333 @@ class Process:
         pass
 
 
+class FenwickTree:
+    """Dynamic weighted sampler: a binary indexed tree of non-negative
+    weights, with O(log n) updates and draws.
+    Rounding errors of the updates are cleared by rebuilding the tree
+    every REBUILD_INTERVAL updates.
+    INPUT:
+    - weights,  list of non-negative floats
+    """
+
+    REBUILD_INTERVAL = 2**16
+
+    def __init__(self, weights):
+        self.weights = [float(w) for w in weights]
+        self.rebuild()
+
+    def __len__(self):
+        return len(self.weights)
+
+    def __getitem__(self, i):
+        return self.weights[i]
+
+    def rebuild(self):
+        """Build the tree from the weights, in O(n)."""
+        n = len(self.weights)
+        tree = [0.] + self.weights
+        for i in range(1, n + 1):
+            parent = i + (i & -i)
+            if parent <= n:
+                tree[parent] += tree[i]
+        self.tree = tree
+        self.n_positive = sum(1 for w in self.weights if w > 0)
+        self.updates = 0
+
+    @property
+    def total(self):
+        """Sum of the weights."""
+        if self.n_positive == 0:
+            return 0.
+        total = 0.
+        i = len(self.weights)
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def update(self, i, weight):
+        """Set the weight of index i."""
+        old = self.weights[i]
+        if weight == old:
+            return
+        self.weights[i] = weight
+        self.n_positive += (weight > 0) - (old > 0)
+        self.updates += 1
+        if self.updates == self.REBUILD_INTERVAL:
+            self.rebuild()
+            return
+        delta = weight - old
+        tree = self.tree
+        n = len(self.weights)
+        j = i + 1
+        while j <= n:
+            tree[j] += delta
+            j += j & -j
+
+    def find(self, value):
+        """Returns the index i such that the sum of the weights before i
+        is at most value, and the sum up to i is above it.
+        Rounding errors of the updates may make the search end on an
+        index with zero weight: the nearest index with positive weight,
+        after it or else before it, is returned instead. Indices with
+        zero weight are returned only if all the weights are zero.
+        """
+        tree = self.tree
+        n = len(self.weights)
+        position = 0
+        step = 1 << (n.bit_length() - 1) if n else 0
+        while step:
+            following = position + step
+            if following <= n and tree[following] <= value:
+                position = following
+                value -= tree[following]
+            step >>= 1
+        # value may reach total with rounding errors
+        position = min(position, n - 1)
+        weights = self.weights
+        if weights[position] > 0 or self.n_positive == 0:
+            return position
+        for i in range(position + 1, n):
+            if weights[i] > 0:
+                return i
+        for i in range(position - 1, -1, -1):
+            if weights[i] > 0:
+                return i
+
+    def draw(self, uniform):
+        """Returns an index drawn with probability proportional to its
+        weight, given a uniform in [0, 1).
+        """
+        return self.find(uniform*self.total)
+
+
+class AliasTable:
+    """Static weighted sampler, with the alias method of Walker:
+    O(n) set up and O(1) draws.
+    INPUT:
+    - weights,  list of non-negative floats, not all zero
+    """
+
+    def __init__(self, weights):
+        weights = np.asarray(weights, dtype=np.float64)
+        n = len(weights)
+        scaled = (weights*n/weights.sum()).tolist()
+        self.probability = np.ones(n)
+        self.alias = np.arange(n)
+        small = [i for i in range(n) if scaled[i] < 1]
+        large = [i for i in range(n) if scaled[i] >= 1]
+        while small and large:
+            i = small.pop()
+            j = large.pop()
+            self.probability[i] = scaled[i]
+            self.alias[i] = j
+            scaled[j] += scaled[i] - 1
+            if scaled[j] < 1:
+                small.append(j)
+            else:
+                large.append(j)
+        # the indices left have probability 1, up to rounding errors
+
+    def __len__(self):
+        return len(self.alias)
+
+    def draw(self, uniforms):
+        """Returns the indices drawn with an array of uniforms in [0, 1),
+        one index per uniform.
+        """
+        scaled = uniforms*len(self.alias)
+        indices = scaled.astype(np.int64)
+        keep = (scaled - indices) < self.probability[indices]
+        return np.where(keep, indices, self.alias[indices])
+
+
 class BlockGossipProcess(Process):
     """The process to manage block gossiping
     INPUT:
-    - nodes,    list of Nodes obejct
-    - tau,      float, process latency
+    - edges,        list of (gossiping, listening) Node objects pairs
+    - tau,          float, process latency
+    - batch_size,   int, number of edges drawn at once
+    - latencies,    list of floats, latency factor of each edge: edge e
+                    gossips with rate 1/(tau*latencies[e]);
+                    all edges gossip with rate 1/tau if None
+    Edges with different rates are drawn with an AliasTable, or with a
+    FenwickTree of the rates of the active edges.
+    By default edges are drawn among all the edges. After
+    track_active_edges, they are drawn among the active edges only:
+    an edge is dropped after an event which does not change its listener,
+    and it is active again when one of its nodes changes in a way which
+    may change the outcome of the event, see activate_peer and
+    Model.active_step.
     """
 
-    def __init__(self, tau, edges, rng=np.random.default_rng()):
+    def __init__(self, tau, edges, rng=np.random.default_rng(),
+                 batch_size=2**16, latencies=None):
         self.edges = edges
         self.num_edges = len(edges)
-
-        super().__init__((tau/self.num_edges))
+        # edges are stored as indices in the list of peers
+        self.peers = sorted({n for edge in edges for n in edge},
+                            key=lambda n: n.id)
+        peer_index = {n: i for i, n in enumerate(self.peers)}
+        self.gossipers = np.array([peer_index[g] for g, _ in edges],
+                                  dtype=np.int64)
+        self.listeners = np.array([peer_index[l] for _, l in edges],
+                                  dtype=np.int64)
+
+        if latencies is None:
+            self.edge_rates = None
+            super().__init__((tau/self.num_edges))
+        else:
+            self.edge_rates = (
+                1/(tau*np.asarray(latencies, dtype=np.float64))).tolist()
+            super().__init__(1/math.fsum(self.edge_rates))
+            self.sampler = AliasTable(self.edge_rates)
         self.rng = rng
+        self.batch_size = batch_size
+        self.__batch = []
+        self.__batch_position = 0
+        # active edges, None if all edges are drawn
+        self.active_edges = None
 
-    def event(self):
-        gossiping_node, listening_node = self.rng.choice(self.edges)
+    @property
+    def lam(self):
+        if self.active_edges is None:
+            return super().lam
+        if self.edge_rates is not None:
+            return self.active_rates.total
+        return len(self.active_edges)*self.edge_rate
+
+    def track_active_edges(self, processes):
+        """Draw only the active edges from now on.
+        processes are the processes, sharing the edges of self, whose
+        edges are activated with the edges of self.
+        """
+        self.edge_rate = self.lam/self.num_edges
+        self.linked_processes = processes
+        # edges of each peer, as gossiper and as listener
+        self.out_edges = [[] for _ in self.peers]
+        self.in_edges = [[] for _ in self.peers]
+        for e, (g, l) in enumerate(zip(self.gossipers.tolist(),
+                                       self.listeners.tolist())):
+            self.out_edges[g].append(e)
+            self.in_edges[l].append(e)
+        self.__batch = []
+        self.__batch_position = 0
+        self.activate_all()
+
+    def activate_all(self):
+        self.active_edges = list(range(self.num_edges))
+        # position of each edge in active_edges, -1 if inactive
+        self.active_position = list(range(self.num_edges))
+        if self.edge_rates is not None:
+            # rates of the edges, zero if inactive
+            self.active_rates = FenwickTree(self.edge_rates)
+
+    def activate_peer(self, peer, version):
+        """Activate the edges of the peer with index peer, after a
+        change of its view from version, see Node.version: its new
+        blocks are sent to its neighbors, and any block it receives may
+        make it attest to a new head, see Node.attestation_is_stale.
+        """
+        node = self.peers[peer]
+        if node.blocks_version != version[0]:
+            self.activate_edges(self.out_edges[peer])
+        if node.attestation_is_stale():
+            self.activate_edges(self.in_edges[peer])
+
+    def activate_edges(self, edges):
+        for e in edges:
+            if self.active_position[e] < 0:
+                self.active_position[e] = len(self.active_edges)
+                self.active_edges.append(e)
+                if self.edge_rates is not None:
+                    self.active_rates.update(e, self.edge_rates[e])
+
+    def deactivate(self, e):
+        if self.active_position[e] < 0:
+            return
+        last = self.active_edges.pop()
+        if last != e:
+            position = self.active_position[e]
+            self.active_edges[position] = last
+            self.active_position[last] = position
+        self.active_position[e] = -1
+        if self.edge_rates is not None:
+            self.active_rates.update(e, 0.)
+
+    def next_edge(self):
+        """Return the next (gossiping, listening) pair of Nodes.
+        Edges are drawn with their rates, batch_size at a time.
+        """
+        if self.__batch_position == len(self.__batch):
+            if self.edge_rates is None:
+                drawn = self.rng.integers(self.num_edges,
+                                          size=self.batch_size)
+            else:
+                drawn = self.sampler.draw(self.rng.random(self.batch_size))
+            self.__batch = list(zip(self.gossipers[drawn].tolist(),
+                                    self.listeners[drawn].tolist()))
+            self.__batch_position = 0
+        g, l = self.__batch[self.__batch_position]
+        self.__batch_position += 1
+        return self.peers[g], self.peers[l]
+
+    def next_active_edge(self):
+        """Return the index of an edge drawn among the active ones,
+        with their rates, with batch_size uniforms drawn at a time.
+        """
+        if self.__batch_position == len(self.__batch):
+            self.__batch = self.rng.random(self.batch_size).tolist()
+            self.__batch_position = 0
+        uniform = self.__batch[self.__batch_position]
+        self.__batch_position += 1
+        if self.edge_rates is not None:
+            return self.active_rates.draw(uniform)
+        return self.active_edges[int(uniform*len(self.active_edges))]
+
+    def transfer(self, gossiping_node, listening_node):
         gossiping_node.gossip(listening_node)
-        return
+
+    def event(self):
+        if self.active_edges is None:
+            gossiping_node, listening_node = self.next_edge()
+            self.transfer(gossiping_node, listening_node)
+            return
+        e = self.next_active_edge()
+        listener = self.listeners[e]
+        listening_node = self.peers[listener]
+        version = listening_node.version()
+        self.transfer(self.peers[self.gossipers[e]], listening_node)
+        if listening_node.version() == version:
+            # the same event would not change anything until
+            # one of the nodes changes
+            self.deactivate(e)
+        else:
+            for process in self.linked_processes:
+                process.activate_peer(listener, version)
 
 
 class AttestationGossipProcess(BlockGossipProcess):
-    def __init__(self, tau, edges, rng=np.random.default_rng()):
-        super().__init__(tau, edges, rng)
+    def __init__(self, tau, edges, rng=np.random.default_rng(),
+                 batch_size=2**16, latencies=None):
+        super().__init__(tau, edges, rng, batch_size, latencies)
+
+    def activate_peer(self, peer, version):
+        """Activate the edges of the peer with index peer, after a
+        change of its view from version, see Node.version: its new
+        attestations are sent to its neighbors. As slots only grow,
+        it accepts attestations it refused before only for new blocks,
+        or if it replaced some with others of the same slot.
+        """
+        node = self.peers[peer]
+        if node.attestations_version != version[1]:
+            self.activate_edges(self.out_edges[peer])
+        if (node.blocks_version != version[0]
+                or node.attestations_rewritten != version[3]):
+            self.activate_edges(self.in_edges[peer])
 
-    def event(self):
-        gossiping_node, listening_node = self.rng.choice(self.edges)
-        listening_node.receive_attestations(gossiping_node.attestations.copy())
-        return
+    def transfer(self, gossiping_node, listening_node):
+        gossiping_node.gossip_attestations(listening_node)
 
 
 class FixedTimeEvent():
@@ -93,19 +410,35 @@ class FixedTimeEvent():
         self.next_event = time + self.offset
 
         self.counter = 0
+        # FixedEventQueue the event is scheduled in, if any
+        self.queue = None
+        self.priority = 0
 
     def trigger(self, next_time):
         """Check if current FixedTimeEvent happens before next
         random event time next_event.
-        If it does, activate the event trough method event().
+        If it does, activate the event trough method event(),
+        as many times as it happens.
         """
+        triggered = False
         while next_time >= self.next_event:
-            self.counter += 1
-            self.event()
-            self.next_event += self.interval
+            self.fire()
+            triggered = True
+        return triggered
 
-            return True
-        return False
+    def fire(self):
+        """Activate the event and move to its next occurrence.
+        """
+        self.counter += 1
+        self.event()
+        self.next_event += self.interval
+
+    def schedule(self, time):
+        """Move the next occurrence of the event to time.
+        """
+        self.next_event = time
+        if self.queue is not None:
+            self.queue.push(self)
 
     def event(self):
         """Activate FixedTimeEvent effects.
@@ -127,7 +460,7 @@ class LateProposal(FixedTimeEvent):
         self.proposer = proposer
 
     def set_next_time(self, time):
-        self.next_event = time + self.delay
+        self.schedule(time + self.delay)
 
     def event(self):
         self.proposer.propose_block()
@@ -205,6 +538,126 @@ class AttestationBoundary(FixedTimeEvent):
                 v.issue_attestation()
 
 
+class FixedEventQueue:
+    """Priority queue of FixedTimeEvent objects keyed on their next_event.
+    Events happening at the same time fire in the order they are given.
+    INPUT:
+    - events,   list of FixedTimeEvent objects
+    """
+
+    def __init__(self, events):
+        self.events = events
+        self.heap = []
+        self.__pushes = 0
+        for priority, event in enumerate(events):
+            event.priority = priority
+            event.queue = self
+            self.push(event)
+
+    def push(self, event):
+        """(Re)schedule event at its next_event.
+        Older entries of the same event are discarded when they surface.
+        """
+        self.__pushes += 1
+        heapq.heappush(self.heap, (event.next_event, event.priority,
+                                   self.__pushes, event))
+
+    def next_time(self):
+        """Return the time of the next fixed event.
+        """
+        heap = self.heap
+        while heap and heap[0][0] != heap[0][-1].next_event:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else np.inf
+
+    def trigger(self, next_time):
+        """Fire, in time order, all the events happening before next_time.
+        """
+        while self.next_time() <= next_time:
+            event = heapq.heappop(self.heap)[-1]
+            event.fire()
+            self.push(event)
+
+
+class BlockTable:
+    """Columnar store of the blocks of a blocktree, indexed by block id.
+    Block ids are given in order of creation, so parents always have a
+    smaller id than their children.
+    The genesis block creates the table and every other block registers
+    itself in the table of its parent.
+    Columns, numpy arrays:
+    - parent,   id of the parent block, -1 for genesis
+    - height,   height of the block
+    - slot,     slot number of the block
+    - emitter,  id of the emitter node, -1 if there is no emitter node
+    - delayer,  True if the emitter node is a delayer
+    """
+
+    COLUMNS = (("parent", np.int32),
+               ("height", np.int32),
+               ("slot", np.int32),
+               ("emitter", np.int32),
+               ("delayer", bool))
+
+    def __init__(self, capacity=1024):
+        # Block objects by id
+        self.blocks = []
+        self.__columns = {name: np.zeros(capacity, dtype=dtype)
+                          for name, dtype in self.COLUMNS}
+
+    def add(self, block):
+        """Register block and return its id.
+        """
+        block_id = len(self.blocks)
+        if block_id == len(self.__columns["parent"]):
+            for name, column in self.__columns.items():
+                self.__columns[name] = np.concatenate(
+                    [column, np.zeros_like(column)])
+        self.blocks.append(block)
+
+        columns = self.__columns
+        columns["parent"][block_id] = -1 if block.parent is None else block.parent.id
+        columns["height"][block_id] = block.height
+        columns["slot"][block_id] = block.slot_no
+        columns["emitter"][block_id] = getattr(block.emitter, "id", -1)
+        columns["delayer"][block_id] = getattr(block.emitter, "delayer", False)
+        return block_id
+
+    def column(self, name):
+        """Return the column name for all the blocks of the table.
+        """
+        return self.__columns[name][:len(self.blocks)]
+
+    @property
+    def parent(self):
+        return self.column("parent")
+
+    @property
+    def height(self):
+        return self.column("height")
+
+    @property
+    def slot(self):
+        return self.column("slot")
+
+    @property
+    def emitter(self):
+        return self.column("emitter")
+
+    @property
+    def delayer(self):
+        return self.column("delayer")
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def __getitem__(self, block_id):
+        return self.blocks[block_id]
+
+    def __iter__(self):
+        return iter(self.blocks)
+
+
 class Block:
     '''Class for blocks.
 
@@ -216,29 +669,89 @@ class Block:
         Parent of the block
     transactions : integer
         Number of transactions in the block
+    attestations : tuple
+        Attestation table of the emitter when the block was created,
+        (block ids, slots) arrays indexed by validator id
     '''
 
-    def __init__(self, emitter="genesis", parent=None, slot_no=0, attestations={}):
+    __slots__ = ("id", "table", "slot_no", "children", "parent", "height",
+                 "emitter", "skip", "attestations")
+
+    def __init__(self, emitter="genesis", parent=None, slot_no=0, attestations=None):
 
         self.slot_no = slot_no
 
-        self.children = set()
+        self.children = []
         self.parent = parent
+        self.attestations = attestations
 
         if parent is None:
             self.parent = None
             self.height = 0
             self.emitter = "genesis"
-            self.predecessors = {self}
+            self.skip = None
+            self.table = BlockTable()
 
         else:
             self.parent = parent
             self.height = self.parent.height + 1
             self.emitter = emitter
-            parent.children.add(self)
-            self.predecessors = parent.predecessors.copy()
-            self.predecessors.add(self)
-            self.attestations = attestations
+            parent.children.append(self)
+            # a single skip pointer per block is enough to reach any
+            # ancestor in O(log(height)) steps
+            self.skip = parent.get_ancestor(skip_height(self.height))
+            self.table = parent.table
+
+        self.id = self.table.add(self)
+
+    @property
+    def predecessors(self):
+        """Set of blocks from genesis to self (included).
+        It is built on demand walking the parent pointers:
+        use is_ancestor_of to test membership.
+        """
+        return set(self.main_chain())
+
+    def get_ancestor(self, height):
+        """Return the ancestor of self at the given height.
+        """
+        if height > self.height or height < 0:
+            return None
+        block = self
+        while block.height > height:
+            height_skip = skip_height(block.height)
+            height_skip_prev = skip_height(block.height - 1)
+            # jump only if the skip does not overshoot and it is not
+            # cheaper to follow the skip of the parent
+            if block.skip is not None and (
+                    height_skip == height
+                    or (height_skip > height
+                        and not (height_skip_prev < height_skip - 2
+                                 and height_skip_prev >= height))):
+                block = block.skip
+            else:
+                block = block.parent
+        return block
+
+    def is_ancestor_of(self, block):
+        """Return True if self is on the chain from genesis to block
+        (block included).
+        """
+        return block.get_ancestor(self.height) is self
+
+    def main_chain(self):
+        """Return the list of blocks from self back to genesis.
+        """
+        chain = []
+        block = self
+        while block is not None:
+            chain.append(block)
+            block = block.parent
+        return chain
+
+    def __hash__(self):
+        # reproducible iteration order and tie-breaks across runs
+        return self.id
 
     def __repr__(self):
         return '<Block {} (h={})>'.format(self.slot_no, self.height)
@@ -250,11 +763,209 @@ class Block:
             raise StopIteration
 
 
+class ForkChoiceStore:
+    """Incremental LMD-GHOST fork choice over a local blocktree.
+
+    Keeps, for every known block, the same weight `lmd_ghost` computes
+    from scratch (the stake of the latest messages pointing inside its
+    subtree, plus the stake attesting the block itself) and updates it
+    as blocks arrive and latest messages move.
+    The head is then found walking down the heaviest children.
+    INPUT:
+    - genesis,      Block object, root of the blocktree
+    - validators,   iterable, validators whose latest message is genesis
+    """
+
+    def __init__(self, genesis, validators=()):
+        self.genesis = genesis
+        self.children = {genesis: []}
+        # k: validator, v: block of its latest message
+        self.latest_messages = dict.fromkeys(validators, genesis)
+        # the attested block is counted twice, as in lmd_ghost
+        self.weights = {genesis: 2*sum(stake_attestation_evaluation(v)
+                                       for v in self.latest_messages)}
+
+    def __contains__(self, block):
+        return block in self.weights
+
+    def __len__(self):
+        return len(self.weights)
+
+    def add_block(self, block):
+        """Add a block whose parent is already in the store.
+        """
+        if block in self.weights:
+            return
+        self.children[block] = []
+        self.children[block.parent].append(block)
+        self.weights[block] = 0
+
+    def on_attestation(self, validator, block):
+        """Move the latest message of validator to block.
+        Only the branches between the old and the new attested block
+        are touched.
+        """
+        old = self.latest_messages.get(validator)
+        if old is block:
+            return
+        stake = stake_attestation_evaluation(validator)
+        self.latest_messages[validator] = block
+        weights = self.weights
+        # the attested block is counted twice, as in lmd_ghost
+        weights[block] += stake
+        if old is None:
+            while block is not None:
+                weights[block] += stake
+                block = block.parent
+            return
+        weights[old] -= stake
+        # walk both branches up to their common ancestor
+        while old is not block:
+            if old.height >= block.height:
+                weights[old] -= stake
+                old = old.parent
+            else:
+                weights[block] += stake
+                block = block.parent
+
+    def head(self):
+        """Return the head of the chain, walking down the heaviest
+        children from genesis.
+        """
+        head_chain = self.genesis
+        children = self.children[head_chain]
+        while children:
+            head_chain = heaviest_block(children, self.weights)
+            children = self.children[head_chain]
+        return head_chain
+
+
+class BlockSet(collections.abc.MutableSet):
+    """Set of blocks of a BlockTable, stored as packed bits indexed by
+    block id: adding and testing a block is a bit operation, the union
+    of two BlockSets is a bitwise or, and their equality a comparison
+    of bytes. It keeps the interface of a set of Block objects,
+    iterated in order of id, so parents before children.
+    INPUT:
+    - table,    BlockTable of the blocks
+    - blocks,   iterable of Block objects of table
+    """
+
+    def __init__(self, table, blocks=()):
+        self.table = table
+        self.bits = bytearray()
+        self.count = 0
+        for block in blocks:
+            self.add(block)
+
+    def _from_iterable(self, blocks):
+        return BlockSet(self.table, blocks)
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, block):
+        i = block.id
+        byte = i >> 3
+        return byte < len(self.bits) and (self.bits[byte] >> (i & 7)) & 1 == 1
+
+    def __iter__(self):
+        table = self.table
+        return iter([table[i] for i in self.ids().tolist()])
+
+    def __eq__(self, other):
+        if not isinstance(other, BlockSet):
+            return super().__eq__(other)
+        if self.count != other.count:
+            return False
+        # with the same count, the bits beyond the shorter set are zeros
+        n = min(len(self.bits), len(other.bits))
+        return memoryview(self.bits)[:n] == memoryview(other.bits)[:n]
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "BlockSet({})".format(self.ids().tolist())
+
+    def reserve(self, n_blocks):
+        """Make room for at least n_blocks block ids."""
+        n_bytes = (n_blocks + 7) >> 3
+        if len(self.bits) < n_bytes:
+            self.bits.extend(bytes(max(n_bytes, 2*len(self.bits))
+                                   - len(self.bits)))
+
+    def add(self, block):
+        i = block.id
+        self.reserve(i + 1)
+        mask = 1 << (i & 7)
+        if not self.bits[i >> 3] & mask:
+            self.bits[i >> 3] |= mask
+            self.count += 1
+
+    def discard(self, block):
+        i = block.id
+        mask = 1 << (i & 7)
+        if block in self:
+            self.bits[i >> 3] &= ~mask
+            self.count -= 1
+
+    def has(self, ids):
+        """Returns True for the ids of the blocks in the set,
+        as a bool for an int, or as a bool array for an array of ids.
+        """
+        if np.ndim(ids) == 0:
+            byte = ids >> 3
+            return byte < len(self.bits) and bool((self.bits[byte] >> (ids & 7)) & 1)
+        self.reserve(len(self.table))
+        ids = np.asarray(ids)
+        bits = np.frombuffer(self.bits, dtype=np.uint8)
+        return ((bits[ids >> 3] >> (ids & 7)) & 1).astype(bool)
+
+    def ids(self):
+        """Returns the sorted array of the ids of the blocks."""
+        bits = np.frombuffer(self.bits, dtype=np.uint8)
+        return np.flatnonzero(np.unpackbits(bits, bitorder="little"))
+
+    def copy(self):
+        blocks = BlockSet(self.table)
+        blocks.bits = bytearray(self.bits)
+        blocks.count = self.count
+        return blocks
+
+    def update(self, *others):
+        for other in others:
+            self |= other
+
+    def __ior__(self, other):
+        if not isinstance(other, BlockSet):
+            return super().__ior__(other)
+        self.reserve(8*len(other.bits))
+        bits = np.frombuffer(self.bits, dtype=np.uint8, count=len(other.bits))
+        np.bitwise_or(bits, np.frombuffer(other.bits, dtype=np.uint8),
+                      out=bits)
+        del bits
+        self.count = int(np.unpackbits(
+            np.frombuffer(self.bits, dtype=np.uint8)).sum())
+        return self
+
+    def __or__(self, other):
+        if not isinstance(other, BlockSet):
+            return super().__or__(other)
+        blocks = self.copy()
+        blocks |= other
+        return blocks
+
+    def union(self, *others):
+        blocks = self.copy()
+        blocks.update(*others)
+        return blocks
+
+
 class Node:
     '''Class for the validator.
 
     INPUT:
-    - blockchain,   list of Block objects,
+    - blockchain,   BlockTable of the global blocktree,
     '''
 
     def __init__(self, blockchain, rng, id, model):
@@ -263,16 +974,60 @@ class Node:
 
         self.rng = rng
 
-        self.local_blockchain = {blockchain[0]}
+        # known blocks, as bits indexed by block id
+        self.local_blockchain = BlockSet(blockchain, [blockchain[0]])
         self.global_blockchain = blockchain
+        # LMD-GHOST weights of the local blocktree, kept up to date
+        self.fork_choice = ForkChoiceStore(blockchain[0],
+                                           validators=range(model.N))
+        # local blocks in order of arrival, parents always come first
+        self.block_log = [blockchain[0]]
+        # k: listening peer, v: number of blocks of block_log already
+        # gossiped to it
+        self.gossiped_blocks = {}
+        # validators whose attestation changed, in order of change,
+        # attestations_log_start is the position of its first entry
+        # since the log was created
+        self.attestations_log = []
+        self.attestations_log_start = 0
+        # k: listening peer, v: positions in the attestations logs of
+        # self and of the peer, and blocks version of the peer, at the
+        # last gossip of attestations to it
+        self.gossiped_attestations = {}
+        self.last_slot_no = blockchain[0].slot_no
 
         self.neighbors = set()  # set of neighbours peers on the p2p network
 
-        self.attestations = {}
+        # latest attestation of each validator (by id): block id and slot,
+        # rows of the attestation table of the model
+        self.attestation_blocks = model.attestation_blocks[id]
+        self.attestation_slots = model.attestation_slots[id]
+        # order independent hash of attestations, to compare views fast
+        self.attestations_fingerprint = attestation_hash(
+            np.arange(model.N), self.attestation_blocks,
+            self.attestation_slots)
+        # k: validator id, v: (block id, slot) of attestations to blocks
+        # which are not known yet
         self.cached_attestations = {}
+        # k: block id, v: set of the validators whose cached attestation
+        # waits for the block
+        self.awaited_blocks = {}
         self.is_attesting = True
         self.delayer = False
 
+        # versions of the local view, bumped on every change
+        self.blocks_version = 0
+        self.attestations_version = 0
+        self.cached_attestations_version = 0
+        # changes replacing attestations with others of the same slot
+        self.attestations_rewritten = 0
+        # head of the chain, cached for the view versions in head_key
+        self.cache_heads = True
+        self.head = None
+        self.head_key = None
+        self.head_cache_hits = 0
+        self.head_cache_misses = 0
+
     def propose_block(self):
         head_of_chain = self.use_lmd_ghost()
         #print('this is head', head_of_chain, ' by ', self)
@@ -281,81 +1036,274 @@ class Node:
 
         new_block = Block(emitter=self, parent=head_of_chain,
                           slot_no=self.model.slot_boundary.counter,
-                          attestations=self.attestations.copy())
+                          attestations=(self.attestation_blocks.copy(),
+                                        self.attestation_slots.copy()))
         #print('new_block pre', new_block.predecessors)
 
-        self.local_blockchain.add(new_block)
-        self.global_blockchain.append(new_block)
+        # the block is in the global blocktree since its creation
+        self.model.n_nodes_with_all_blocks = 0
+        self.add_block(new_block)
         return
 
+    def add_block(self, block):
+        """Add a block, whose parent is already known, to the local
+        blocktree.
+        """
+        self.local_blockchain.add(block)
+        self.fork_choice.add_block(block)
+        self.block_log.append(block)
+        self.blocks_version += 1
+        self.last_slot_no = max(self.last_slot_no, block.slot_no)
+        # local blocktrees are subsets of the global one
+        if len(self.local_blockchain) == len(self.global_blockchain):
+            self.model.n_nodes_with_all_blocks += 1
+
+    @property
+    def attestations(self):
+        """Latest attestations as a dict {validator: (Block, slot)}.
+        It is built from the attestation table on each access.
+        """
+        peers = self.model.peers
+        return {peers[v]: (self.global_blockchain[b], s)
+                for v, (b, s) in enumerate(zip(self.attestation_blocks.tolist(),
+                                               self.attestation_slots.tolist()))}
+
+    def set_attestations(self, validators, blocks, slots):
+        """Record the latest messages of validators, with blocks ids
+        and slots arrays, and move their weight in the fork choice store.
+        """
+        old_blocks = self.attestation_blocks[validators]
+        old_slots = self.attestation_slots[validators]
+        changed = (old_blocks != blocks) | (old_slots != slots)
+        if not changed.any():
+            return
+        validators = validators[changed]
+        blocks = blocks[changed]
+        slots = slots[changed]
+        self.attestation_blocks[validators] = blocks
+        self.attestation_slots[validators] = slots
+        self.attestations_version += 1
+        self.attestations_log.extend(validators.tolist())
+        if len(self.attestations_log) > 2*len(self.attestation_slots):
+            # a longer delta costs more than sending every attestation
+            half = len(self.attestations_log)//2
+            del self.attestations_log[:half]
+            self.attestations_log_start += half
+        if (old_slots[changed] == slots).any():
+            self.attestations_rewritten += 1
+        cached = self.cached_attestations
+        for v, b, s in zip(validators.tolist(), blocks.tolist(),
+                           slots.tolist()):
+            self.fork_choice.on_attestation(v, self.global_blockchain[b])
+            # a cached attestation which is not newer is never applied
+            if cached and v in cached and cached[v][1] <= s:
+                self.uncache_attestation(v)
+
+        fingerprint = (self.attestations_fingerprint
+                       - attestation_hash(validators, old_blocks[changed],
+                                          old_slots[changed])
+                       + attestation_hash(validators, blocks, slots))
+        fingerprint &= FINGERPRINT_MASK
+        self.model.update_attestations_fingerprint(
+            self.attestations_fingerprint, fingerprint)
+        self.attestations_fingerprint = fingerprint
+
+    def set_attestation(self, validator, block, slot):
+        """Record the latest message of a validator (by ids).
+        """
+        if (self.attestation_blocks[validator] == block
+                and self.attestation_slots[validator] == slot):
+            return
+        self.set_attestations(np.array([validator]), np.array([block]),
+                              np.array([slot]))
+
     def issue_attestation(self):
-        self.attestations[self] = (self.use_lmd_ghost(),
-                                   self.model.slot_boundary.counter)
-
-    def receive_attestations(self, attestations):
-        attestations_old = self.attestations.copy()
-        attestations_with_known_blocks = {}
-
-        for k, v in attestations.items():
-            # check if block is known
-            if v[0] not in self.local_blockchain:
-                if k in self.cached_attestations.keys():
-                    # check if slot is higher of the new attestation
-                    if self.cached_attestations[k][1]<v[1]:
-                        self.cached_attestations[k] = v
-                else:
-                    self.cached_attestations[k]=v
-            else:
-                attestations_with_known_blocks[k]=v
-
-        self.attestations.update(attestations_with_known_blocks)
-        
-        # check for whether all the attestations belong to a newer slot
-        for k, v in attestations_old.items():
-            if attestations_old[k][1] > self.attestations[k][1]:
-                self.attestations[k] = attestations_old[k]
-
-    def check_cached_attestations(self):
-        _cached_attestations = self.cached_attestations.copy()
-        for k,v in _cached_attestations.items():
-            if v[0] in self.local_blockchain:
-                # delete from cache
-                _ = self.cached_attestations.pop(k, 'None')
-                #check if other attest from validator
-                if k in self.attestations.keys():
-                    # check issuing slot
-                    if self.attestations[k][1]<v[1]:
-                        self.attestations[k]=v
-                else:
-                    self.attestations[k]=v
+        head = self.use_lmd_ghost()
+        self.set_attestation(self.id, head.id,
+                             self.model.slot_boundary.counter)
+
+    def attestation_is_stale(self):
+        """Returns True if listening to blocks, even known ones,
+        would issue a new attestation, see Node.listen.
+        """
+        counter = self.model.slot_boundary.counter
+        if self.is_attesting is not True or self.last_slot_no != counter:
+            return False
+        return (self.attestation_slots[self.id] != counter
+                or self.attestation_blocks[self.id] != self.use_lmd_ghost().id)
+
+    def receive_attestations(self, blocks, slots, validators=None):
+        """Merge the attestations of another node, given as block ids
+        and slots arrays indexed by validator id.
+        If validators, a sorted array of validator ids, is given,
+        only their attestations are merged.
+        """
+        if validators is None:
+            sent_blocks, sent_slots = blocks, slots
+            slots_mine = self.attestation_slots
+        else:
+            sent_blocks, sent_slots = blocks[validators], slots[validators]
+            slots_mine = self.attestation_slots[validators]
+        known = self.local_blockchain.has(sent_blocks)
+        # attestations to unknown blocks wait in the cache
+        if known.all():
+            unknown = []
+        elif validators is None:
+            unknown = np.flatnonzero(~known).tolist()
+        else:
+            unknown = validators[~known].tolist()
+        for k in unknown:
+            v = (int(blocks[k]), int(slots[k]))
+            # attestations of a slot already applied are never applied
+            if v[1] <= self.attestation_slots[k]:
+                continue
+            # check if slot is higher of the new attestation
+            if (k not in self.cached_attestations
+                    or self.cached_attestations[k][1] < v[1]):
+                self.cache_attestation(k, v)
+        # keep the old attestation only if it belongs to a newer slot
+        accepted = np.flatnonzero(known & (sent_slots >= slots_mine))
+        if validators is not None:
+            accepted = validators[accepted]
+        self.set_attestations(accepted, blocks[accepted], slots[accepted])
+
+    def cache_attestation(self, validator, attestation):
+        """Cache the attestation (block id, slot) of validator to a block
+        which is not known yet, in place of its cached one.
+        """
+        if validator in self.cached_attestations:
+            self.uncache_attestation(validator)
+        self.cached_attestations[validator] = attestation
+        self.awaited_blocks.setdefault(attestation[0], set()).add(validator)
+        self.cached_attestations_version += 1
+
+    def uncache_attestation(self, validator):
+        """Remove the cached attestation of validator, and return it."""
+        attestation = self.cached_attestations.pop(validator)
+        waiting = self.awaited_blocks[attestation[0]]
+        waiting.discard(validator)
+        if not waiting:
+            del self.awaited_blocks[attestation[0]]
+        self.cached_attestations_version += 1
+        return attestation
+
+    def check_cached_attestations(self, blocks=None):
+        """Apply the cached attestations waiting for blocks, iterable of
+        Block objects which are now known, or for any known block if
+        blocks is None.
+        The cache holds at most one attestation per validator, newer than
+        the applied one: older attestations are dropped, see
+        set_attestations.
+        """
+        if blocks is None:
+            awaited = [b for b in self.awaited_blocks
+                       if self.local_blockchain.has(b)]
+        else:
+            awaited = [b.id for b in blocks if b.id in self.awaited_blocks]
+        if not awaited:
+            return
+        validators = sorted(v for b in awaited for v in self.awaited_blocks[b])
+        attestations = [self.uncache_attestation(v) for v in validators]
+        validators = np.array(validators)
+        blocks = np.array([b for b, _ in attestations])
+        slots = np.array([s for _, s in attestations])
+        # check issuing slot
+        newer = slots > self.attestation_slots[validators]
+        self.set_attestations(validators[newer], blocks[newer], slots[newer])
 
     def update_local_blockchain(self, block):
         """
         When self.Node receive a new block,
         update the local copy of the blockchain.
+        INPUT:
+        - block,    iterable of Block objects, parents before children
         """
-        self.local_blockchain = self.local_blockchain.union(block)
-        self.check_cached_attestations()
+        new_blocks = []
+        for b in block:
+            if b not in self.local_blockchain:
+                self.add_block(b)
+                new_blocks.append(b)
+        if new_blocks:
+            self.check_cached_attestations(new_blocks)
 
     # TODO: gossip blocks, naming should be changed accordingly
     def gossip(self, listening_node):
+        """Send to listening_node the blocks received since the last
+        gossip to it.
+        """
         # self.non_gossiped_to.remove(listening_node)
-        listening_node.listen(self)
+        start = self.gossiped_blocks.get(listening_node, 0)
+        self.gossiped_blocks[listening_node] = len(self.block_log)
+        listening_node.listen(self, self.block_log[start:])
+
+    def gossip_attestations(self, listening_node):
+        """Send to listening_node the attestations which changed, on
+        either node, since the last gossip to it: the others would not
+        change its view. Every attestation is sent on the first gossip,
+        after listening_node received new blocks, which may make it
+        accept attestations to them, or when the logs of the changes
+        were compacted.
+        """
+        last = self.gossiped_attestations.get(listening_node)
+        if (last is None or last[2] != listening_node.blocks_version
+                or last[0] < self.attestations_log_start
+                or last[1] < listening_node.attestations_log_start):
+            listening_node.receive_attestations(self.attestation_blocks,
+                                                self.attestation_slots)
+        else:
+            changed = (
+                self.attestations_log[last[0] - self.attestations_log_start:]
+                + listening_node.attestations_log[
+                    last[1] - listening_node.attestations_log_start:])
+            if changed:
+                listening_node.receive_attestations(
+                    self.attestation_blocks, self.attestation_slots,
+                    np.unique(changed))
+        self.gossiped_attestations[listening_node] = (
+            self.attestations_log_start + len(self.attestations_log),
+            listening_node.attestations_log_start
+            + len(listening_node.attestations_log),
+            listening_node.blocks_version)
 
     # TODO: listen blocks, naming should be changed accordingly
-    def listen(self, gossiping_node):
+    def listen(self, gossiping_node, blocks=None):
         """Receive new block and update local information accordingly.
+        If blocks is None, the whole local blocktree of gossiping_node
+        is received.
         """
         #block = gossiping_node.use_lmd_ghost()
-        self.update_local_blockchain(gossiping_node.local_blockchain)
+        if blocks is None:
+            blocks = sorted(gossiping_node.local_blockchain,
+                            key=lambda x: x.height)
+        self.update_local_blockchain(blocks)
 
+        # blocks are never from a slot later than the current one
         if self.is_attesting is True:
-            for b in self.local_blockchain:
-                if b.slot_no == self.model.slot_boundary.counter:
-                    self.issue_attestation()
+            if self.last_slot_no == self.model.slot_boundary.counter:
+                self.issue_attestation()
+
+    def version(self):
+        """Returns a key which changes whenever the local view changes:
+        blocks, attestations or cached attestations.
+        """
+        return (self.blocks_version, self.attestations_version,
+                self.cached_attestations_version, self.attestations_rewritten)
 
     def use_lmd_ghost(self):
-        return lmd_ghost(self.local_blockchain, self.attestations)
+        """Return the head of the local blocktree.
+        The head is recomputed only if blocks or attestations changed
+        since the last call, unless cache_heads is False.
+        """
+        if not self.cache_heads:
+            return self.fork_choice.head()
+        key = (self.blocks_version, self.attestations_version)
+        if key == self.head_key:
+            self.head_cache_hits += 1
+        else:
+            self.head_cache_misses += 1
+            self.head = self.fork_choice.head()
+            self.head_key = key
+        return self.head
 
     def __repr__(self):
         return '<Node {}>'.format(self.id)
@@ -391,6 +1339,58 @@ class Network:
             for k in self.network.neighbors(n):
                 m.neighbors.add(self.network.nodes[k]['name'])
 
+    def latencies(self, edges, attribute):
+        """Returns the latency factor of each edge, as the product of the
+        values of attribute of the edge and of its two nodes in the
+        graph, missing values being 1.
+        INPUT:
+        - edges,        list of pairs of peers, see set_neighborhood
+        - attribute,    str, name of the node and edge attribute
+        """
+        graph_nodes = {data['name']: n
+                       for n, data in self.network.nodes(data=True)}
+        latencies = []
+        for peer_n, peer_k in edges:
+            n, k = graph_nodes[peer_n], graph_nodes[peer_k]
+            latencies.append(self.network.nodes[n].get(attribute, 1.)
+                             * self.network.edges[n, k].get(attribute, 1.)
+                             * self.network.nodes[k].get(attribute, 1.))
+        return latencies
+
+    @functools.cached_property
+    def adjacency(self):
+        """Adjacency matrix of the network, as a scipy sparse matrix.
+        Rows follow the order of self.network.nodes().
+        """
+        return nx.to_scipy_sparse_array(self.network, format="csr")
+
+    def distances(self, sources=None, chunk_size=256):
+        """Yields the hop distances from sources to all the nodes,
+        as float arrays of shape (chunk, N), in chunks of chunk_size
+        sources. Unreachable nodes are at distance inf.
+        INPUT:
+        - sources,      indices of the source nodes in self.network.nodes(),
+                        all the nodes if None
+        - chunk_size,   int, number of sources per chunk
+        """
+        if sources is None:
+            sources = np.arange(len(self))
+        nodes = list(self.network.nodes())
+        index = {n: i for i, n in enumerate(nodes)}
+        for start in range(0, len(sources), chunk_size):
+            chunk = sources[start:start + chunk_size]
+            if csgraph is not None:
+                yield csgraph.shortest_path(
+                    self.adjacency, unweighted=True, indices=chunk)
+                continue
+            # breadth first search with networkx
+            rows = np.full((len(chunk), len(nodes)), np.inf)
+            for row, source in zip(rows, chunk):
+                lengths = nx.single_source_shortest_path_length(
+                    self.network, nodes[source])
+                row[[index[n] for n in lengths]] = list(lengths.values())
+            yield rows
+
 
 class Gillespie:
     '''
@@ -405,33 +1405,72 @@ class Gillespie:
                       interact) (Not necessarily needed)
     - tau_block     - float, block gossip latency
     - tau_attest    - float, attestation gossip latency
+    - rng_mode      - "legacy" or "batched", how random numbers are drawn:
+                      "legacy" draws one uniform for the time increment and
+                      one rng.choice for the process at each step;
+                      "batched" pre-draws batch_size exponential increments
+                      and batch_size uniforms for the process selection,
+                      which is done on a cumulative table of the rates.
+                      Both are reproducible for a fixed seed, but they
+                      consume the rng in a different order, hence give
+                      different trajectories.
+    - batch_size    - int, number of random numbers drawn at once in
+                      "batched" mode
     '''
 
+    RNG_MODES = ("legacy", "batched")
+
     def __init__(self,
                  processes,
-                 rng=np.random.default_rng()):
+                 rng=np.random.default_rng(),
+                 rng_mode="legacy",
+                 batch_size=2**16):
 
+        if rng_mode not in self.RNG_MODES:
+            raise ValueError("rng_mode must be one of {}".format(self.RNG_MODES))
         self.rng = rng
+        self.rng_mode = rng_mode
+        self.batch_size = batch_size
 
         self.processes = processes
 
-        self.lambdas = [process.lam for process in self.processes]
-        self.lambda_sum = np.sum(self.lambdas)
-        self.lambda_weighted = [process.lam/self.lambda_sum
-                                for process in self.processes]
+        self.lambdas = None
+        self.update_lambdas()
+
+        self.__exponentials = []
+        self.__uniforms = []
+        self.__exponentials_position = 0
+        self.__uniforms_position = 0
 
     def update_lambdas(self):
         '''Lambdas are recauculated after each time increment
         '''
-        self.lambdas = [process.lam for process in self.processes]
-        self.lambda_sum = np.sum(self.lambdas)
-        self.lambda_weighted = [process.lam/self.lambda_sum
-                                for process in self.processes]
+        lambdas = [process.lam for process in self.processes]
+        if lambdas == self.lambdas:
+            return
+        self.lambdas = lambdas
+        self.lambda_sum = sum(lambdas)
+        if self.lambda_sum == 0:
+            # nothing happens until the rates change, see Model.run
+            return
+        self.lambda_weighted = [lam/self.lambda_sum for lam in lambdas]
+        # upper bounds of each process in [0, 1)
+        self.lambda_cumulative = list(itertools.accumulate(self.lambda_weighted))
+        self.lambda_cumulative[-1] = 1.
 
     def calculate_time_increment(self):
         '''Function to generate the random time increment
             from an exponential random distribution.
         '''
+        if self.rng_mode == "batched":
+            if self.__exponentials_position == len(self.__exponentials):
+                self.__exponentials = self.rng.standard_exponential(
+                    self.batch_size).tolist()
+                self.__exponentials_position = 0
+            increment = self.__exponentials[self.__exponentials_position]
+            self.__exponentials_position += 1
+            return increment / self.lambda_sum
+
         increment = (-np.log(self.rng.random())
                      / self.lambda_sum).astype('float64')
         return increment
@@ -440,17 +1479,130 @@ class Gillespie:
         '''Selects the next process according to its weight
         and it executes the related event.
         '''
+        if self.rng_mode == "batched":
+            if self.__uniforms_position == len(self.__uniforms):
+                self.__uniforms = self.rng.random(self.batch_size).tolist()
+                self.__uniforms_position = 0
+            uniform = self.__uniforms[self.__uniforms_position]
+            self.__uniforms_position += 1
+            return self.processes[
+                bisect.bisect_right(self.lambda_cumulative, uniform)]
+
         select_process = self.rng.choice(self.processes,
                                          p=self.lambda_weighted)
         return select_process
 
 
+class Profiler:
+    """Counts and times the calls of the methods run by Model.run:
+    the event of each process and fixed event, grouped by class,
+    the heads of the nodes (lmd_ghost) and their computation by the
+    fork choice store (fork_choice), and the convergence check
+    (views_are_synced), with the fast forwards it allows.
+    The methods are wrapped on the instances by attach, so a model
+    without profiler runs the plain methods.
+    Times are inclusive: the time of a slot boundary contains the time
+    of the lmd_ghost calls of its block proposal.
+    INPUT:
+    - snapshot_interval,    float, simulated seconds between snapshots
+                            of the counts and times, no snapshots if None
+    """
+
+    def __init__(self, snapshot_interval=None):
+        self.snapshot_interval = snapshot_interval
+        self.counts = {}
+        self.times = {}
+        self.fast_forwards = 0
+        self.snapshots = []
+        self.next_snapshot = snapshot_interval or np.inf
+        self.start = None
+
+    def attach(self, model):
+        self.start = time.perf_counter()
+        for event in model.processes + model.fixed_events:
+            event.event = self.wrap(type(event).__name__, event.event)
+        for node in model.nodes:
+            node.use_lmd_ghost = self.wrap("lmd_ghost", node.use_lmd_ghost)
+            node.fork_choice.head = self.wrap("fork_choice",
+                                              node.fork_choice.head)
+        views_are_synced = self.wrap("views_are_synced",
+                                     model.views_are_synced)
+
+        def check(*args):
+            # called once per step of Model.run, after time is updated
+            if model.time >= self.next_snapshot:
+                self.snapshot(model)
+            synced = views_are_synced(*args)
+            self.fast_forwards += synced
+            return synced
+
+        model.views_are_synced = check
+
+    def wrap(self, name, method):
+        self.counts.setdefault(name, 0)
+        self.times.setdefault(name, 0.)
+
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.times[name] += time.perf_counter() - start
+                self.counts[name] += 1
+        return timed
+
+    def snapshot(self, model):
+        self.snapshots.append({
+            "time": model.time,
+            "wall_time": time.perf_counter() - self.start,
+            "counts": dict(self.counts),
+            "times": dict(self.times),
+            })
+        while self.next_snapshot <= model.time:
+            self.next_snapshot += self.snapshot_interval
+
+    def report(self, model):
+        """Returns a dict with, for each name, the number of calls,
+        the calls per simulated second and the wall time per call.
+        """
+        return {
+            "wall_time": time.perf_counter() - self.start,
+            "counts": dict(self.counts),
+            "times": dict(self.times),
+            "calls_per_second": {
+                name: count/model.time if model.time else 0.
+                for name, count in self.counts.items()},
+            "time_per_call": {
+                name: self.times[name]/count if count else 0.
+                for name, count in self.counts.items()},
+            "fast_forwards": self.fast_forwards,
+            "snapshots": list(self.snapshots),
+            }
+
+
 class Model:
     '''Initiates the model and builds it around the parameters given
     model.gillespie.run to run the simulation.
     All objects are contained in the class.
+    rng_mode selects how the Gillespie scheduler draws random numbers,
+    see Gillespie.
+    cache_heads enables the cache of the heads of the nodes,
+    see Node.use_lmd_ghost.
+    path_metrics selects how diameter and average shortest path are
+    computed, with path_samples and path_tolerance,
+    see calculate_diameter and calculate_average_shortest_path.
+    profile counts and times the events of the run, every
+    snapshot_interval simulated seconds too, see Profiler and Model.stats.
+    gossip_mode "active" draws gossip only on the edges which may carry
+    new information, see BlockGossipProcess and Model.run.
+    latency is the name of the node and edge attributes of graph with the
+    latency factors of the gossip on each edge, see Network.latencies;
+    every edge has the same latency if None.
     '''
 
+    GOSSIP_MODES = ("all", "active")
+
     # pylint: disable=too-many-instance-attributes
     # the number of attributes is none of pylint business
 
@@ -460,23 +1612,55 @@ class Model:
                  tau_attest=None,
                  delay_share=0,
                  delay_time=0,
-                 seed=None):
+                 seed=None,
+                 rng_mode="legacy",
+                 cache_heads=True,
+                 path_metrics="exact",
+                 path_samples=100,
+                 path_tolerance=None,
+                 profile=False,
+                 snapshot_interval=None,
+                 gossip_mode="all",
+                 latency=None):
+        if gossip_mode not in self.GOSSIP_MODES:
+            raise ValueError("gossip_mode must be one of {}".format(self.GOSSIP_MODES))
         # set random seed
-        self.rng = np.random.default_rng(seed)
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.rng = np.random.default_rng(self.seed_sequence)
+        # gossip processes draw from their own streams
+        block_gossip_rng, attestation_gossip_rng = [
+            np.random.default_rng(s) for s in self.seed_sequence.spawn(2)]
         # set internal variables
         self.tau_block = tau_block
         self.tau_attest = tau_attest
         self.slots_per_epoch = 1
         self.delay_share = delay_share
         self.delay_time = delay_time
-        # init the blocktree
-        self.blockchain = [Block()]
+        # init the blocktree, stored in the table of the genesis block
+        self.blockchain = Block().table
+        # number of nodes which know every block
+        self.n_nodes_with_all_blocks = 0
+        # k: attestations fingerprint, v: number of nodes sharing it
+        self.attestations_fingerprints = {}
         # set up peers
         self.network = Network(graph)
         self.N = len(self.network)
+        # attestation table: row i is the view of node i, column j the
+        # latest attestation of validator j, as block id and slot
+        self.attestation_blocks = np.full((self.N, self.N),
+                                          self.blockchain[0].id,
+                                          dtype=np.int32)
+        self.attestation_slots = np.full((self.N, self.N), -1, dtype=np.int32)
         self.nodes = [Node(blockchain=self.blockchain,
                            rng=self.rng, id=i, model=self)
                       for i in range(self.N)]
+        # peers by id, self.nodes is shuffled by the epoch boundary
+        self.peers = list(self.nodes)
+        for node in self.nodes:
+            node.cache_heads = cache_heads
+        self.n_nodes_with_all_blocks = self.N
+        self.attestations_fingerprints = {
+            self.nodes[0].attestations_fingerprint: self.N}
         # validators == peers
         self.validators = self.nodes
         # set up delayers nodes
@@ -484,20 +1668,25 @@ class Model:
             self.delay_nodes = self.rng.choice(self.nodes, size=math.floor(self.N*self.delay_share))
             for node in self.delay_nodes:
                 node.delayer = True
-        # init attestations
-        for node in self.nodes:
-            node.attestations = {v: (self.blockchain[0], -1)
-                                 for v in self.validators}
         # set up p2p network
         self.network.set_neighborhood(self.nodes)
-        self.edges = [(n, k) for n in self.nodes for k in n.neighbors]
+        self.edges = [(n, k) for n in self.nodes
+                      for k in sorted(n.neighbors, key=lambda x: x.id)]
 
+        if latency is None:
+            latencies = None
+        else:
+            latencies = self.network.latencies(self.edges, latency)
         # set up stochastic processes
         self.block_gossip_process = BlockGossipProcess(tau=self.tau_block,
-                                                       edges=self.edges)
+                                                       edges=self.edges,
+                                                       rng=block_gossip_rng,
+                                                       latencies=latencies)
         self.attestation_gossip_process = AttestationGossipProcess(
             tau=self.tau_attest,
-            edges=self.edges)
+            edges=self.edges,
+            rng=attestation_gossip_rng,
+            latencies=latencies)
 
         self.epoch_boundary = EpochBoundary(slot_interval=12,
                                             validators=self.validators,
@@ -518,42 +1707,168 @@ class Model:
 
         self.processes = [self.block_gossip_process,
                           self.attestation_gossip_process]
+        self.gossip_mode = gossip_mode
+        if gossip_mode == "active":
+            for process in self.processes:
+                process.track_active_edges(self.processes)
         self.fixed_events = [self.epoch_boundary, self.slot_boundary,
                              self.attestation_boundary, self.late_proposal]
+        self.fixed_event_queue = FixedEventQueue(self.fixed_events)
         # set up gillespie model
-        self.gillespie = Gillespie(self.processes, self.rng)
+        self.gillespie = Gillespie(self.processes, self.rng,
+                                   rng_mode=rng_mode)
+        # metrics returned by results
+        self.metrics = MetricsEngine()
+        if path_metrics != "exact":
+            [path_rng] = [
+                np.random.default_rng(s) for s in self.seed_sequence.spawn(1)]
+            self.metrics.register("diameter", functools.partial(
+                diameter, method=path_metrics, n_samples=path_samples,
+                rng=path_rng))
+            # the double sweep only bounds the diameter
+            self.metrics.register("average_shortest_path", functools.partial(
+                average_shortest_path, method="sampled",
+                n_samples=path_samples, tolerance=path_tolerance,
+                rng=path_rng))
         self.time = 0
+        # number of gillespie events run
+        self.n_events = 0
+        if profile:
+            self.profiler = Profiler(snapshot_interval)
+            self.profiler.attach(self)
+        else:
+            self.profiler = None
 
-    def run(self, stoping_time):
+    def run(self, stoping_time, checkpoint_path=None, checkpoint_interval=None):
         """Method to run the model. Needs stopping time.
+        If checkpoint_path is given, the model is saved there every
+        checkpoint_interval simulated seconds, see Model.checkpoint.
         """
+        if checkpoint_path is not None and checkpoint_interval is not None:
+            next_checkpoint = (self.time//checkpoint_interval + 1)*checkpoint_interval
+        else:
+            next_checkpoint = np.inf
+        if self.gossip_mode == "active":
+            step = self.active_step
+        else:
+            step = self.step
         while self.time < stoping_time:
-            # generate next random increment time and save it in self.increment
-            increment = self.gillespie.calculate_time_increment()
+            step()
+            if self.time >= next_checkpoint:
+                self.checkpoint(checkpoint_path)
+                while next_checkpoint <= self.time:
+                    next_checkpoint += checkpoint_interval
+
+    def step(self):
+        """Run the fixed events before the next gossip event, and the
+        gossip event.
+        """
+        # generate next random increment time and save it in self.increment
+        increment = self.gillespie.calculate_time_increment()
 
-            # loop over fixed and trigger if time passes fixed event time
-            for fixed in self.fixed_events:
-                fixed.trigger(self.time + increment)
+        # trigger fixed events if time passes fixed event time
+        self.fixed_event_queue.trigger(self.time + increment)
 
-            # select poisson process and trigger selected process
-            next_process = self.gillespie.select_event()
-            next_process.event()
+        self.gossip(increment)
 
-            self.time += increment
+    def active_step(self):
+        """Run the next event, gossip on an active edge or fixed event.
+        The rates of the processes are those of their active edges.
+        The time to the next gossip is drawn again after a fixed event,
+        which activates the edges of the peers it changes: the processes
+        being memoryless, the events are distributed as with all the edges.
+        """
+        self.gillespie.update_lambdas()
+        next_time = self.fixed_event_queue.next_time()
+        if self.gillespie.lambda_sum > 0:
+            increment = self.gillespie.calculate_time_increment()
+        else:
+            increment = np.inf
+        if self.time + increment < next_time:
+            self.gossip(increment)
+        elif next_time < np.inf:
+            self.time = next_time
+            versions = [node.version()
+                        for node in self.block_gossip_process.peers]
+            self.fixed_event_queue.trigger(next_time)
+            self.activate_changed_peers(versions)
+        else:
+            # nothing will ever happen
+            self.time = np.inf
 
-            # to increase performance
-            flag_blocks_are_the_same = True
-            flag_attestations_are_the_same = True
-            for n in self.nodes[1:]:
-                if self.nodes[0].local_blockchain != n.local_blockchain:
-                    flag_blocks_are_the_same = False
-                    break
-                if self.nodes[0].attestations != n.attestations:
-                    flag_attestations_are_the_same = False
-                    break
+    def activate_changed_peers(self, versions):
+        """Activate the edges of the peers changed by fixed events,
+        given their versions before them. The new slot, or the start of
+        the attestations, may also make a peer attest to a new head.
+        """
+        for peer, version in enumerate(versions):
+            for process in self.processes:
+                process.activate_peer(peer, version)
+
+    def gossip(self, increment):
+        # select poisson process and trigger selected process
+        next_process = self.gillespie.select_event()
+        next_process.event()
+        self.n_events += 1
+
+        self.time += increment
+
+        # to increase performance: if all nodes share the same view
+        # nothing happens until the next fixed event
+        if self.views_are_synced():
+            self.time = self.fixed_event_queue.next_time()
+
+    def stats(self):
+        """Returns a dict with the statistics of the run:
+        simulated time, number of gillespie events, hits and misses
+        of the heads caches, and the report of the profiler in profile,
+        if the model has one.
+        """
+        stats = {"time": self.time, "n_events": self.n_events}
+        stats.update(self.head_cache_stats())
+        if self.profiler is not None:
+            stats["profile"] = self.profiler.report(self)
+        return stats
+
+    def head_cache_stats(self):
+        """Returns the hits and misses of the nodes heads caches.
+        """
+        return {
+            "head_cache_hits": sum(n.head_cache_hits for n in self.nodes),
+            "head_cache_misses": sum(n.head_cache_misses for n in self.nodes),
+            }
 
-            if flag_blocks_are_the_same and flag_attestations_are_the_same:
-                self.time = min([fixed.next_event for fixed in self.fixed_events])
+    def update_attestations_fingerprint(self, old, new):
+        """Move a node from the old to the new attestations fingerprint.
+        """
+        self.attestations_fingerprints[old] -= 1
+        if self.attestations_fingerprints[old] == 0:
+            del self.attestations_fingerprints[old]
+        self.attestations_fingerprints[new] = (
+            self.attestations_fingerprints.get(new, 0) + 1)
+
+    def views_are_synced(self):
+        """Return True if all nodes have the same blocks and attestations.
+        Local blocktrees are the same iff they all contain every block;
+        attestations are compared only when all fingerprints match.
+        """
+        if self.n_nodes_with_all_blocks < self.N:
+            return False
+        if len(self.attestations_fingerprints) > 1:
+            return False
+        # rule out hash collisions
+        return bool((self.attestation_blocks == self.attestation_blocks[0]).all()
+                    and (self.attestation_slots == self.attestation_slots[0]).all())
+
+    def latest_attestations(self):
+        """Returns the attestations from a god pov:
+        for each node the latest attestation issued by the node,
+        as a dict {node: (Block, slot)}.
+        """
+        return {
+            node: (self.blockchain[self.attestation_blocks[node.id, node.id]],
+                   self.attestation_slots[node.id, node.id])
+            for node in self.validators}
 
     def results(self):
         """This functions returns a dictionary containing the
@@ -564,37 +1879,130 @@ class Model:
         --------
         results : dictionary
         """
-        # attestations from a god pov
-        # for each node we have the latest attestations issued by the node
-        god_view_attestations = {node: node.attestations[node] for node in self.validators}
-
-        results_dict = {
-            "mainchain_rate": calculate_mainchain_rate(self.blockchain, god_view_attestations),
-            "branch_ratio": calculate_branch_ratio(self.blockchain, god_view_attestations),
-            "blocktree_entropy": calculate_entropy(self.blockchain),
-            "diameter": calculate_diameter(self.network),
-            "average_shortest_path": calculate_average_shortest_path(self.network),
-            "delayer_orphan_rate": calculate_delayer_orphan_rate(self.blockchain, god_view_attestations),
-            }
+        god_view_attestations = self.latest_attestations()
+
+        # fork choice, main chain and children counts are shared
+        results_dict = self.metrics.compute(self.blockchain,
+                                            god_view_attestations,
+                                            network=self.network)
         return results_dict
 
+    def checkpoint(self, path):
+        """Save the whole state of the model in path, so that
+        Model.from_checkpoint(path).run(t) continues the run exactly
+        as self.run(t) would.
+        The file holds two pickles: the blocks, as the arrays of
+        blocktree_to_arrays, and then
+        the nodes and the model, where blocks and nodes are written
+        as ids, so pickle never follows the links between them.
+        The file is replaced atomically.
+        """
+        if self.profiler is not None:
+            raise ValueError("a profiled model cannot be checkpointed")
+        nodes = sorted(self.nodes, key=lambda n: n.id)
+        blocks = blocktree_to_arrays(self.blockchain, self.N)
+        blocks["version"] = CHECKPOINT_VERSION
+        blocks["delayers"] = np.array([n.delayer for n in nodes], dtype=bool)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pkl.dump(blocks, f, protocol=pkl.HIGHEST_PROTOCOL)
+            _CheckpointPickler(f, protocol=pkl.HIGHEST_PROTOCOL).dump({
+                # the attestation rows are views of the model table
+                "nodes": [{k: v for k, v in node.__dict__.items()
+                           if k not in ("attestation_blocks",
+                                        "attestation_slots")}
+                          for node in nodes],
+                "model": self,
+                })
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def from_checkpoint(cls, path):
+        """Load a model saved by Model.checkpoint.
+        """
+        with open(path, "rb") as f:
+            blocks = pkl.load(f)
+            if blocks["version"] != CHECKPOINT_VERSION:
+                raise ValueError("checkpoint version %s, expected %s" % (
+                    blocks["version"], CHECKPOINT_VERSION))
+            # the nodes, by id, are filled after the blocks
+            # which refer to them
+            nodes = []
+            for i, delayer in enumerate(blocks["delayers"]):
+                node = Node.__new__(Node)
+                node.id = i
+                node.delayer = bool(delayer)
+                nodes.append(node)
+            table = blocktree_from_arrays(blocks, nodes)
+            state = _CheckpointUnpickler(f, table, nodes).load()
+        model = state["model"]
+        for node, node_state in zip(nodes, state["nodes"]):
+            node.__dict__.update(node_state)
+            node.attestation_blocks = model.attestation_blocks[node.id]
+            node.attestation_slots = model.attestation_slots[node.id]
+        return model
+
     def dump_blockchain_data(self, path, blockchain=None):
-        """Dump blocks in a pickle.
-        Careful in using with pyspg.
+        """Dump the blocks, and the latest attestations of the nodes,
+        in path.npz, see save_blocktree and load_blocktree.
         """
         if blockchain is None:
             blockchain = self.blockchain
-        with open(path + ".pkl", "wb") as pfile:
-            pkl.dump(blockchain, pfile)
+        save_blocktree(path + ".npz", blockchain, self.latest_attestations(),
+                       self.N)
+
+
+class _CheckpointPickler(pkl.Pickler):
+    """Pickler writing blocks, nodes and the block table as ids."""
+
+    def persistent_id(self, obj):
+        if isinstance(obj, Block):
+            return ("block", obj.id)
+        if isinstance(obj, Node):
+            return ("node", obj.id)
+        if isinstance(obj, BlockTable):
+            return ("table", None)
+        return None
+
+
+class _CheckpointUnpickler(pkl.Unpickler):
+    """Unpickler of _CheckpointPickler, given the table and the nodes."""
+
+    def __init__(self, file, table, nodes):
+        super().__init__(file)
+        self.table = table
+        self.nodes = nodes
+
+    def persistent_load(self, pid):
+        kind, i = pid
+        if kind == "block":
+            return self.table[i]
+        if kind == "node":
+            return self.nodes[i]
+        return self.table
 
 
 # FUNCTIONS
 # LMD Ghost following functions handle LMD Ghost Evaluation of Blocks
 
 
+def skip_height(height):
+    """Height of the ancestor the skip pointer of a block at the given
+    height points to.
+    Same scheme of the skip list used by the Bitcoin block index.
+    """
+    if height < 2:
+        return 0
+    # n & (n - 1) clears the lowest set bit of n
+    if height & 1:
+        height = (height - 1) & (height - 2)
+        return (height & (height - 1)) + 1
+    return height & (height - 1)
+
+
 def find_leaves_of_blockchain(blockchain):
     parent_blocks = {b.parent for b in blockchain}
-    return blockchain - parent_blocks
+    return set(blockchain) - parent_blocks
 
 
 def stake_attestation_evaluation(node):
@@ -603,187 +2011,528 @@ def stake_attestation_evaluation(node):
     return 1
 
 
+def attestation_hash(validators, blocks, slots):
+    """Returns the sum, modulo 2**64, of a 64 bit hash of each
+    attestation, given as arrays of validators ids, block ids and slots.
+    """
+    h = (validators.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+         + blocks.astype(np.uint64) * np.uint64(0xC2B2AE3D27D4EB4F)
+         + slots.astype(np.uint64) * np.uint64(0x165667B19E3779F9))
+    # mix the bits, as in the splitmix64 finalizer
+    h ^= h >> np.uint64(31)
+    h *= np.uint64(0xBF58476D1CE4E5B9)
+    h ^= h >> np.uint64(29)
+    return int(h.sum(dtype=np.uint64))
+
+
 def lmd_ghost(blockchain, attestations):
     """Returns the current head of the chain following LMD-GHOST algorithm
     from [0].
 
     [0]: Buterin, Vitalik, et al. "Combining GHOST and casper."arXiv preprint arXiv:2003.03052 (2020)."""
 
-    # k:peer, v[0]: pointer to the attested block
-    attest = {k: v[0] for k, v in attestations.items()}
-    # blocks with at least one children
-    parent_blocks = {b.parent for b in blockchain if b.parent is not None}
-    # blocks with no children
-    # leaves = blockchain - parent_blocks
-    # for each leave, chain from the genesis to the leaf
-    # chains = {b: b.predecessors for b in leaves}
-    # key: block, item: list of nodes attesting to it
-    inverse_attestations = {}
-    for node, block in attest.items():
-        inverse_attestations[block] = inverse_attestations.get(block, []) + [node]
-
-    # define lambda function to return stake weight of a list of peers
-    sum_stake = lambda node_list : sum([stake_attestation_evaluation(node) for node in node_list])
-    # evaluate leaves weight
-    leaves_weight = {block: sum_stake(item) for block, item in inverse_attestations.items()}
-    # todo: check if it's correct
-    # total_leaves_weight = sum(list(leaves_weight.values()))
-    # assign weight to all blocks in the local blocktree
-    # all blocks have 0 by default
-    blocks_weight = {block: 0 for block in blockchain}
-    # attested leaves have a non-zero weight
-    blocks_weight.update(leaves_weight)
-    # diffuse the non-zero weight upward the blocktree branches
-    for leaf, leaf_weight in leaves_weight.items():
-        for block in leaf.predecessors:
-            blocks_weight[block] += leaf_weight
+    table, in_blockchain = block_mask(blockchain)
+    blocks_weight = lmd_ghost_weights(table, attestations)
     # find lmd ghost head chain
     # continue until leaf(from local peer pow)
-    # head_chain = blockchain.genesis  # TODO: use a method of Blockchain class
-    head_chain = [block for block in blockchain if block.parent is None].pop()
-    while len([child for child in head_chain.children if child in blockchain]) > 0:
-        local_children = [child for child in head_chain.children if child in blockchain]
-        # pop a random item from children set
-        list_head_chain = [local_children.pop()]
-        current_max = blocks_weight[list_head_chain[0]]
-        while len(local_children) > 0:
-            block = local_children.pop()
-            # compare children weights
-            if blocks_weight[block] > current_max:
-                list_head_chain = [block]
-                current_max = blocks_weight[block]
-            elif blocks_weight[block] == current_max:
-                list_head_chain.append(block)
-        # tie-breaks
-        sorted(list_head_chain, key=hash)
+    head_chain = table[0]
+    while True:
+        children_weight = {child: blocks_weight[child.id]
+                          for child in head_chain.children
+                          if in_blockchain[child.id]}
+        if not children_weight:
+            break
         # update new head chain
-        head_chain = list_head_chain[0]
+        head_chain = heaviest_block(children_weight, children_weight)
 
     return head_chain
 
 
-def blockchain_to_digraph(blockchain):
-    leaves = find_leaves_of_blockchain(blockchain)
+def lmd_ghost_weights(table, attestations):
+    """Returns the LMD-GHOST weight of every block of table, as a list
+    indexed by block id: the stake of the attestations to blocks in its
+    subtree, plus the stake of the attestations to the block itself.
+    """
+    # k:peer, v[0]: pointer to the attested block
+    attested_weight = [0] * len(table)
+    for node, v in attestations.items():
+        attested_weight[v[0].id] += stake_attestation_evaluation(node)
+
+    # diffuse the non-zero weight upward the blocktree branches:
+    # children have larger ids than their parents, so each block passes
+    # the weight of its whole subtree to its parent
+    subtree_weight = attested_weight.copy()
+    parent = table.parent.tolist()
+    for block_id in range(len(table) - 1, 0, -1):
+        if subtree_weight[block_id]:
+            subtree_weight[parent[block_id]] += subtree_weight[block_id]
+
+    return [a + w for a, w in zip(attested_weight, subtree_weight)]
+
+
+def block_mask(blockchain):
+    """Returns the BlockTable the blocks of blockchain belong to,
+    and a boolean array, indexed by block id, which is True for the
+    blocks in blockchain.
+    blockchain is a BlockTable or an iterable of Block objects,
+    containing the genesis block.
+    """
+    if isinstance(blockchain, BlockTable):
+        return blockchain, np.ones(len(blockchain), dtype=bool)
+    block_ids = [block.id for block in blockchain]
+    table = next(iter(blockchain)).table
+    in_blockchain = np.zeros(len(table), dtype=bool)
+    in_blockchain[block_ids] = True
+    return table, in_blockchain
+
+
+def main_chain_mask(table, head):
+    """Returns a boolean array, indexed by block id, which is True for
+    the blocks from genesis to head.
+    """
+    in_main_chain = np.zeros(len(table), dtype=bool)
+    parent = table.parent
+    block_id = head.id
+    while block_id >= 0:
+        in_main_chain[block_id] = True
+        block_id = parent[block_id]
+    return in_main_chain
+
+
+def heaviest_block(blocks, blocks_weight):
+    """Returns the block with the largest weight.
+    Ties are broken choosing the block with the smallest hash,
+    which is the block created first.
+    """
+    current_max = max(blocks_weight[block] for block in blocks)
+    list_head_chain = [block for block in blocks
+                       if blocks_weight[block] == current_max]
+    # tie-breaks
+    return min(list_head_chain, key=hash)
+
+
+def blocktree_to_arrays(blockchain, n_validators=None):
+    """Returns the blocks of a BlockTable as a dict of flat arrays,
+    indexed by block id:
+    - parent, height, slot, emitter, delayer,   the columns of the table
+    - has_attestations,     True if the block has an attestation table
+    and the attestation tables of these blocks, in order of id:
+    - attestation_blocks,   ids of the attested blocks, (n, validators)
+    - attestation_slots,    slots of the attestations, (n, validators)
+    n_validators is the number of columns of the attestation tables,
+    taken from the blocks if None, and 0 if no block has attestations.
+    """
+    attested = [b.attestations for b in blockchain
+                if b.attestations is not None]
+    if n_validators is None:
+        n_validators = len(attested[0][0]) if attested else 0
+    arrays = {name: blockchain.column(name).copy()
+              for name, _ in BlockTable.COLUMNS}
+    arrays["has_attestations"] = np.array(
+        [b.attestations is not None for b in blockchain], dtype=bool)
+    for i, name in enumerate(("attestation_blocks", "attestation_slots")):
+        arrays[name] = np.zeros((len(attested), n_validators), dtype=np.int32)
+        for row, a in zip(arrays[name], attested):
+            row[:] = a[i]
+    return arrays
+
+
+def blocktree_from_arrays(arrays, emitters=None):
+    """Rebuild the BlockTable of blocktree_to_arrays, creating the
+    blocks in order of id, without recursion.
+    The attestation tables are restored only if arrays has them.
+    INPUT:
+    - arrays,   dict, or npz file, of arrays
+    - emitters, list of the emitters by id, with id and delayer
+                attributes; if None, records of the ids and delayer
+                flags of the arrays
+    """
+    parent = np.asarray(arrays["parent"])
+    slot = np.asarray(arrays["slot"])
+    emitter = np.asarray(arrays["emitter"])
+    if emitters is None:
+        delayers = np.zeros(max(emitter.max(initial=-1) + 1, 0), dtype=bool)
+        delayers[emitter[emitter >= 0]] = np.asarray(
+            arrays["delayer"])[emitter >= 0]
+        emitters = [Emitter(i, bool(d)) for i, d in enumerate(delayers)]
+    if "attestation_blocks" in arrays:
+        has_attestations = np.asarray(arrays["has_attestations"])
+        attestations = zip(arrays["attestation_blocks"],
+                           arrays["attestation_slots"])
+    else:
+        has_attestations = np.zeros(len(parent), dtype=bool)
+    table = Block().table
+    if has_attestations[0]:
+        table[0].attestations = next(attestations)
+    for i in range(1, len(parent)):
+        Block(emitter=emitters[emitter[i]] if emitter[i] >= 0 else "genesis",
+              parent=table[parent[i]],
+              slot_no=int(slot[i]),
+              attestations=next(attestations) if has_attestations[i] else None)
+    return table
+
+
+# emitter of the blocks loaded by load_blocktree
+Emitter = collections.namedtuple("Emitter", ["id", "delayer"])
+
+
+def save_blocktree(path, blockchain, attestations=None, n_validators=None):
+    """Write a BlockTable in a .npz file, as the arrays of
+    blocktree_to_arrays, and attestations, if given, as the arrays:
+    - validators,   ids of the validators
+    - blocks,       ids of the attested blocks
+    - slots,        slots of the attestations
+    INPUT:
+    - path,         path of the file
+    - blockchain,   BlockTable
+    - attestations, dict {validator: (Block, slot)}, validators are
+                    nodes or ids
+    - n_validators, int, number of validators, see blocktree_to_arrays
+    """
+    arrays = blocktree_to_arrays(blockchain, n_validators)
+    if attestations is not None:
+        arrays["validators"] = np.array(
+            [getattr(v, "id", v) for v in attestations], dtype=np.int32)
+        arrays["blocks"] = np.array(
+            [b.id for b, _ in attestations.values()], dtype=np.int32)
+        arrays["slots"] = np.array(
+            [slot for _, slot in attestations.values()], dtype=np.int32)
+    with open(path, "wb") as f:
+        np.savez(f, **arrays)
+
+
+def load_blocktree(path, block_attestations=False):
+    """Load a blocktree written by save_blocktree.
+    Only the arrays used are read from the file: the attestation
+    tables of the blocks, the largest ones, only if block_attestations.
+    Returns the BlockTable and the attestations, as a dict
+    {validator id: (Block, slot)}, or None if the file has none.
+    """
+    with np.load(path) as data:
+        arrays = {name: data[name] for name in
+                  ("parent", "slot", "emitter", "delayer")}
+        if block_attestations:
+            for name in ("has_attestations", "attestation_blocks",
+                         "attestation_slots"):
+                arrays[name] = data[name]
+        table = blocktree_from_arrays(arrays)
+        if "validators" not in data:
+            return table, None
+        attestations = {
+            int(v): (table[b], int(slot)) for v, b, slot in
+            zip(data["validators"], data["blocks"], data["slots"])}
+    return table, attestations
 
-    d = {}
-    for leaf in leaves:
-        b = leaf
-        while b:
-            d[b] = {b.parent}
-            b = b.parent
-            if b in d.keys():
-                break
 
-    return nx.from_dict_of_dicts(d, create_using=nx.DiGraph)
+def blockchain_to_digraph(blockchain):
+    """Returns the blocktree as a networkx.DiGraph of Block objects,
+    with an edge from each block to its parent.
+    blockchain is a BlockTable, e.g. from load_blocktree,
+    or an iterable of Block objects.
+    """
+    table, in_blockchain = block_mask(blockchain)
+    block_ids = np.flatnonzero(in_blockchain)
+    parents = table.parent[block_ids]
+
+    G = nx.DiGraph()
+    G.add_nodes_from(table[i] for i in block_ids)
+    G.add_edges_from((table[i], table[p])
+                     for i, p in zip(block_ids, parents) if p >= 0)
+    return G
 
 
 def get_longest_chain(blockchain):
-    if isinstance(blockchain, set):
-        bc = list(blockchain)
-    else:
-        bc = blockchain.copy()
+    bc = list(blockchain)
     bc.sort(key=lambda x: x.height, reverse=True)
     return bc[0]
 
 
-def calculate_mainchain_rate(blockchain, attestations):
+def count_children(table, in_blockchain=None):
+    """Returns the number of children of each block of table, as an
+    array indexed by block id.
+    If the boolean mask in_blockchain is given, only children in it
+    are counted.
+    """
+    parent = table.parent[1:]
+    if in_blockchain is not None:
+        parent = parent[in_blockchain[1:]]
+    return np.bincount(parent, minlength=len(table))
+
+
+class BlocktreeStats:
+    """Quantities shared by the metrics of a blocktree, each computed
+    at most once, when a metric first needs it.
+    INPUT:
+    - blockchain,   BlockTable, or list or set of Block objects
+    - attestations, dict {validator: (Block, slot)}, used for fork choice
+    - head,         Block object, head of the chain, computed with
+                    lmd_ghost if not given
+    - network,      Network object, for the p2p network metrics
+    """
+
+    def __init__(self, blockchain, attestations=None, head=None, network=None):
+        self.blockchain = blockchain
+        self.table, self.in_blockchain = block_mask(blockchain)
+        self.attestations = attestations
+        self.network = network
+        if head is not None:
+            self.head = head
+
+    @functools.cached_property
+    def head(self):
+        return lmd_ghost(self.blockchain, self.attestations)
+
+    @functools.cached_property
+    def n_blocks(self):
+        return int(self.in_blockchain.sum())
+
+    @functools.cached_property
+    def in_main_chain(self):
+        return main_chain_mask(self.table, self.head)
+
+    @functools.cached_property
+    def n_children(self):
+        """Number of children of each block, in the whole blocktree."""
+        return count_children(self.table)
+
+    @functools.cached_property
+    def n_local_children(self):
+        """Number of children of each block, in blockchain only."""
+        return count_children(self.table, self.in_blockchain)
+
+
+def mainchain_rate(stats):
+    # the main chain goes from genesis to the head
+    return (stats.head.height + 1)/stats.n_blocks
+
+
+def branch_ratio(stats):
+    # the siblings of a mainchain block are orphans,
+    # genesis has no siblings
+    main_chain_parents = stats.table.parent[stats.in_main_chain]
+    main_chain_parents = main_chain_parents[main_chain_parents >= 0]
+    counter = int((stats.n_local_children[main_chain_parents] - 1).sum())
+
+    return counter/(stats.head.height + 1)
+
+
+def blocktree_entropy(stats):
+    # compute the degree frequency
+    degrees = stats.n_children[stats.in_blockchain]
+    degrees_unique, degrees_counts = np.unique(degrees, return_counts=True)
+    degrees_frequencies = degrees_counts/degrees_counts.sum()
+    tmp = 0
+    for prob in degrees_frequencies:
+        tmp -= prob*np.log(prob)
+    return tmp
+
+
+def delayer_orphan_rate(stats):
+    delayer_blocks = stats.in_blockchain & stats.table.delayer
+    block_counter = int(np.count_nonzero(delayer_blocks))
+    orphan_counter = int(np.count_nonzero(delayer_blocks & ~stats.in_main_chain))
+
+    return orphan_counter/block_counter
+
+
+class MetricsEngine:
+    """Computes a set of metrics on a blocktree, sharing fork choice,
+    main chain and children counts among all of them.
+    A metric is a function taking a BlocktreeStats object and returning
+    its value; new ones are added with register.
+    INPUT:
+    - metrics,  dict {name: function}, DEFAULT_METRICS if not given
+    """
+
+    def __init__(self, metrics=None):
+        if metrics is None:
+            metrics = DEFAULT_METRICS
+        self.metrics = dict(metrics)
+
+    def register(self, name, metric):
+        self.metrics[name] = metric
+
+    def compute(self, blockchain, attestations, head=None, network=None):
+        """Returns a dict {name: value} with all the metrics.
+        """
+        stats = BlocktreeStats(blockchain, attestations, head, network)
+        return {name: metric(stats) for name, metric in self.metrics.items()}
+
+
+def calculate_mainchain_rate(blockchain, attestations, head=None):
     """Compute the ratio of blocks in the mainchain over the total
     number of blocks produced in the simulation.
 
     Parameters:
     -----------
-    blockchain : A list of Block objects
+    blockchain : A BlockTable, or a list of Block objects
+    head : Block object, head of the chain, computed with lmd_ghost
+        if not given
 
     Returns:
     --------
     xi : float
         Mainchain blocks ratio
     """
-
-    if isinstance(blockchain, list):
-        blockchain = set(blockchain)
-    head_block = lmd_ghost(blockchain, attestations)
-    main_chain = head_block.predecessors
-    return len(main_chain)/len(blockchain)
+    return mainchain_rate(BlocktreeStats(blockchain, attestations, head))
 
 
-def calculate_branch_ratio(blockchain, attestations):
+def calculate_branch_ratio(blockchain, attestations, head=None):
     """Compute the branch Ratio, which measures how often forks hap-
-    pen
+    pen: the number of orphan blocks sharing the parent of a mainchain
+    block, over the number of mainchain blocks.
 
     Parameters:
     -----------
-    blockchain : A list of Block objects
+    blockchain : A BlockTable, or a list of Block objects
+    head : Block object, head of the chain, computed with lmd_ghost
+        if not given
 
     Returns:
     --------
     F : float
         The branching ratio
     """
-
-    # check blockchain is actually a list or a set
-    # TODO: do we really need it?
-    # if isinstance(blockchain, set):
-    #    blockchain_list = list(blockchain)
-    #else:
-    #    blockchain_list = blockchain.copy()
-    if isinstance(blockchain, list):
-        blockchain = set(blockchain)
-    main_chain= lmd_ghost(blockchain, attestations).predecessors
-    orphan_chain = blockchain - main_chain
-
-    counter = 0
-    for block in main_chain:
-        for orphan in orphan_chain:
-            if block.parent == orphan.parent:
-                counter += 1
-
-    return counter/len(main_chain)
+    return branch_ratio(BlocktreeStats(blockchain, attestations, head))
 
 
 def calculate_entropy(blockchain):
     """Compute the entropy of the in-degree distribution of the blocktree
     """
-    # compute the degree frequency
-    degrees = np.array([len(block.children) for block in blockchain])
-    degrees_unique, degrees_counts = np.unique(degrees, return_counts=True)
-    degrees_frequencies = degrees_counts/degrees_counts.sum()
-    tmp = 0
-    for prob in degrees_frequencies:
-        tmp -= prob*np.log(prob)
-    return tmp
+    return blocktree_entropy(BlocktreeStats(blockchain))
 
 
-def calculate_diameter(net):
-    """Compute diameter of the p2p network
-    """
-    return nx.diameter(net.network)
+PATH_METRICS_METHODS = ("exact", "sampled", "double_sweep")
 
 
-def calculate_average_shortest_path(net):
-    """Compute diameter of the p2p network
-    """
-    return nx.average_shortest_path_length(net.network)
+def _not_connected_error():
+    return nx.NetworkXError(
+        "Found infinite path length because the graph is not connected")
 
 
-def calculate_delayer_orphan_rate(blockchain, attestations):
+def calculate_diameter(net, method="exact", n_samples=100, rng=None):
+    """Compute diameter of the p2p network
+    INPUT:
+    - net,          Network object
+    - method,       "exact" runs a breadth first search from every node,
+                    "sampled" from n_samples random nodes,
+                    "double_sweep" from a random node and then from
+                    the farthest node from it.
+                    The last two give a lower bound of the diameter.
+    - n_samples,    int, number of sources of the "sampled" method
+    - rng,          numpy random Generator used to pick the sources
+    The exact diameter is read from net.network.graph["diameter"]
+    when it is set.
+    """
+    if method not in PATH_METRICS_METHODS:
+        raise ValueError("unknown path metrics method %r" % (method,))
+    # precomputed, e.g. by the topology cache
+    if method == "exact" and "diameter" in net.network.graph:
+        return net.network.graph["diameter"]
+    if method == "exact" and csgraph is None:
+        return nx.diameter(net.network)
+    if rng is None:
+        rng = np.random.default_rng()
+
+    if method == "double_sweep":
+        [first] = net.distances([rng.integers(len(net))])
+        if np.isinf(first).any():
+            raise _not_connected_error()
+        [second] = net.distances([int(first.argmax())])
+        return int(second.max())
+
+    if method == "sampled" and n_samples < len(net):
+        sources = rng.choice(len(net), size=n_samples, replace=False)
+    else:
+        sources = None
+    diameter = 0
+    for rows in net.distances(sources):
+        diameter = max(diameter, rows.max())
+    if np.isinf(diameter):
+        raise _not_connected_error()
+    return int(diameter)
+
+
+def calculate_average_shortest_path(net, method="exact", n_samples=100,
+                                    tolerance=None, rng=None):
+    """Compute the average shortest path length of the p2p network
+    INPUT:
+    - net,          Network object
+    - method,       "exact" runs a breadth first search from every node,
+                    "sampled" from random nodes and averages
+                    their mean distance to the other nodes
+    - n_samples,    int, number of sources of the "sampled" method
+    - tolerance,    float, if given the "sampled" method adds sources,
+                    n_samples at a time, until the standard error
+                    of the estimate is below tolerance times the estimate
+    - rng,          numpy random Generator used to pick the sources
+    The exact value is read from net.network.graph["average_shortest_path"]
+    when it is set.
+    """
+    if method not in ("exact", "sampled"):
+        raise ValueError("unknown path metrics method %r" % (method,))
+    if method == "exact" and "average_shortest_path" in net.network.graph:
+        return net.network.graph["average_shortest_path"]
+    n = len(net)
+    if n == 1:
+        return 0
+    if method == "exact" and csgraph is None:
+        return nx.average_shortest_path_length(net.network)
+    if method == "exact" or n_samples >= n:
+        total = 0
+        for rows in net.distances():
+            if np.isinf(rows).any():
+                raise _not_connected_error()
+            total += int(rows.sum())
+        return total/(n*(n - 1))
+
+    if rng is None:
+        rng = np.random.default_rng()
+    # the mean distance from each source, sources without replacement
+    order = rng.permutation(n)
+    means = []
+    for start in range(0, n, n_samples):
+        for rows in net.distances(order[start:start + n_samples]):
+            if np.isinf(rows).any():
+                raise _not_connected_error()
+            means.extend(rows.sum(axis=1)/(n - 1))
+        estimate = np.mean(means)
+        if tolerance is None:
+            break
+        if len(means) < 2:
+            continue
+        # with finite population correction, it is 0 once all are sampled
+        error = np.std(means, ddof=1)/np.sqrt(len(means))*np.sqrt(
+            1 - len(means)/n)
+        if error <= tolerance*estimate:
+            break
+    return float(estimate)
+
+
+def diameter(stats, **kwargs):
+    return calculate_diameter(stats.network, **kwargs)
+
+
+def average_shortest_path(stats, **kwargs):
+    return calculate_average_shortest_path(stats.network, **kwargs)
+
+
+def calculate_delayer_orphan_rate(blockchain, attestations, head=None):
     """Compute the orphan rate for blocks produced by
     delayer nodes.
     The orphan rate is defined as the number of blocks produced by delayers
     that are orphaned over the total number of blocks produced by delayers.
+    If head is not given, it is computed with lmd_ghost.
     """
-    if isinstance(blockchain, list):
-        blockchain = set(blockchain)
-    head_block = lmd_ghost(blockchain, attestations)
-    main_chain = head_block.predecessors
-
-    orphan_counter = 0
-    block_counter = 0
-    for block in blockchain:
-        if block.emitter != 'genesis':
-            if block.emitter.delayer:
-                block_counter += 1
-                if block not in main_chain:
-                    orphan_counter += 1
-
-    return orphan_counter/block_counter
+    return delayer_orphan_rate(BlocktreeStats(blockchain, attestations, head))
+
+
+# metrics returned by Model.results, in order
+DEFAULT_METRICS = {
+    "mainchain_rate": mainchain_rate,
+    "branch_ratio": branch_ratio,
+    "blocktree_entropy": blocktree_entropy,
+    "diameter": diameter,
+    "average_shortest_path": average_shortest_path,
+    "delayer_orphan_rate": delayer_orphan_rate,
+    }
@@ -15,9 +15,9 @@
     You should have received a copy of the GNU Lesser General Public License
     along with ethereum-consensus-abm.  If not, see <http://www.gnu.org/licenses/>.
 """
-from spg.runner import SingleRunner
-from eth_base import Model
-import networkx as nx
+import functools
+from topology import TopologyCache
+from sweep import Sweep, simulate
 
 
 def parse_command_line():
@@ -29,7 +29,7 @@ def parse_command_line():
     parser.add_option("--repeat", action='store', dest="repeat", type='int',
                       default=None, help="number of repetitions")
     parser.add_option("--filter", action='store', dest="filter", type='str',
-                      default=None, help="filter the parameters")
+                      default=None, help="filter the parameters, spg runner only")
     parser.add_option("--workers", action='store', dest="workers", type='int',
                       default=None, help="number of workers")
     parser.add_option(
@@ -38,82 +38,68 @@ def parse_command_line():
             dest="rewrite",
             help="if the csv file - if existing - should be rewritten. If not added, append operation is performed"
             )
+    parser.add_option(
+            "--runner",
+            action='store',
+            dest="runner",
+            type='choice',
+            choices=["spg", "pool"],
+            default="spg",
+            help="spg runs with pyspg, pool with a pool of processes, skipping the runs already in the csv file"
+            )
+    parser.add_option("--seed", action='store', dest="seed", type='int',
+                      default=None, help="root seed of the runs, pool runner only")
+    parser.add_option("--chunksize", action='store', dest="chunksize", type='int',
+                      default=1, help="runs sent at once to a worker, pool runner only")
+    parser.add_option("--format", action='store', dest="format", type='choice',
+                      choices=["csv", "parquet"], default="csv",
+                      help="format of the results, pool runner only")
+    parser.add_option(
+            "--topology-seed",
+            action='store',
+            dest="topology_seed",
+            type='int',
+            default=None,
+            help="seed of the p2p networks, random if not given"
+            )
+    parser.add_option(
+            "--topology-cache",
+            action='store',
+            dest="topology_cache",
+            type='str',
+            default=None,
+            help="directory where the p2p networks are cached, needs --topology-seed"
+            )
 
     command = sys.argv[0]
     options, args = parser.parse_args()
+    # without a seed each run would cache a graph which is never reused
+    if options.topology_cache is not None and options.topology_seed is None:
+        parser.error("--topology-cache needs --topology-seed")
+    if options.filter is not None and options.runner == "pool":
+        parser.error("--filter is only supported by the spg runner")
 
     return command, options, args
 
 
-def __set_up_topology(parameters):
-    topology = parameters['network_topology']
-    number_of_nodes = parameters['no_nodes']
-    desired_avg_degree = parameters['no_neighs']
-    ba_m = parameters['no_neighs']
-
-    # generate network depending on topology parameter
-    if topology == "UNIFORM":
-        net_p2p = nx.random_degree_sequence_graph(
-            [desired_avg_degree for i in range(number_of_nodes)])
-
-    elif topology == "ER":
-        p = desired_avg_degree / (number_of_nodes - 1)
-        net_p2p = nx.fast_gnp_random_graph(number_of_nodes, p)
-
-    elif topology == "BA":
-        net_p2p = nx.barabasi_albert_graph(number_of_nodes, ba_m)
-
-    elif topology == "SBM":
-        sbm_p_inter = parameters['p_sbm_inter']
-        p_intra = desired_avg_degree/number_of_nodes*(1-sbm_p_inter)
-        p_inter = desired_avg_degree/number_of_nodes*sbm_p_inter
-        net_p2p = nx.stochastic_block_model(
-                [
-                    number_of_nodes//2,
-                    number_of_nodes//2
-                ],
-                [
-                    [p_intra, p_inter],
-                    [p_inter, p_intra]
-                ]
-                    )
-
-    elif topology == "TREE":
-        tree_r = parameters['tree_r']
-        net_p2p = nx.full_rary_tree(tree_r, number_of_nodes)
-
-    # get largest connected component
-    lcc_set = max(nx.connected_components(net_p2p), key=len)
-    net_p2p = net_p2p.subgraph(lcc_set).copy()
-    # some nodes may have been removed because they were not port of the lcc.
-    # relabel nodes so that only nodes in lcc are labelled.
-    # (without it we run into problems where node labels are higher than the
-    # number of nodes -> loops run into indexing problems)
-    net_p2p = nx.convert_node_labels_to_integers(
-        net_p2p, first_label=0)
-
-    # some nodes may have been removed as they were not part of the lcc
-    # -> update num nodes
-    number_of_nodes = len(net_p2p)
-
-    return net_p2p
-
-
 def run_simulation(parameters):
     """Simulation wrapper
     INPUTS:
     OUTPUTS:
     - results,  dict
     """
-    model = Model(
-            graph=__set_up_topology(parameters),
-            tau_block=parameters['tau_block'],
-            tau_attest=parameters['tau_attestation'],
-            delay_share=parameters['delay_share'],
-            delay_time=parameters['delay_time'],
-            )
-    model.run(parameters["simulation_time"])
-    return model.results()
+    results = simulate(parameters,
+                       topology_seed=options.topology_seed,
+                       topology_cache=topology_cache())
+    # pyspg only writes the outputs of ethereum_abm.stdout
+    del results["n_events"]
+    return results
+
+
+def topology_cache():
+    if options.topology_cache is None:
+        return None
+    return TopologyCache(options.topology_cache)
 
 
 command, options, args = parse_command_line()
@@ -123,6 +109,18 @@ if __name__ == "__main__":
 
     for arg in args:
 
+        if options.runner == "pool":
+            sweep = Sweep(arg, options.repeat or 1, seed=options.seed,
+                          format=options.format)
+            sweep.run(functools.partial(simulate,
+                                        topology_seed=options.topology_seed,
+                                        topology_cache=topology_cache()),
+                      options.workers,
+                      chunksize=options.chunksize,
+                      rewrite=options.rewrite)
+            continue
+
+        from spg.runner import SingleRunner
         runner = SingleRunner(arg, options.repeat)
         if options.filter is not None:
             runner.filter(options.filter)
@@ -0,0 +1,415 @@
+"""
+    copyright 2022 uzh
+    This file is part of ethereum-consensus-abm.
+
+    ethereum-consensus-abm is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    ethereum-consensus-abm is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with ethereum-consensus-abm.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import concurrent.futures
+import csv
+import itertools
+import os
+import shutil
+import time
+import numpy as np
+from eth_base import Model
+from topology import set_up_topology
+
+# python types of the .input files
+INPUT_TYPES = {"int": int, "float": float, "str": str}
+# columns written after the outputs, for each run
+PROVENANCE = ["task", "seed", "wall_time", "n_events", "peak_memory"]
+
+
+def simulate(parameters, seed=None, topology_seed=None, topology_cache=None):
+    """Run one simulation and return its results.
+    INPUT:
+    - parameters,       dict, parameters of the .input file
+    - seed,             int, seed of the model,
+                        and of the p2p network if topology_seed is None
+    - topology_seed,    int, seed of the p2p network
+    - topology_cache,   TopologyCache object, or path of its directory
+    OUTPUTS:
+    - results,  dict, with the number of events in n_events
+    """
+    if topology_seed is None:
+        topology_seed = seed
+    model = Model(
+            graph=set_up_topology(parameters,
+                                  seed=topology_seed,
+                                  cache=topology_cache),
+            tau_block=parameters['tau_block'],
+            tau_attest=parameters['tau_attestation'],
+            delay_share=parameters['delay_share'],
+            delay_time=parameters['delay_time'],
+            seed=seed,
+            )
+    model.run(parameters["simulation_time"])
+    results = model.results()
+    results["n_events"] = model.n_events
+    return results
+
+
+def read_input(path):
+    """Parse a pyspg .input file.
+    Returns a dict {name: (type, default)}, default is None
+    if the parameter has none.
+    """
+    definitions = {}
+    with open(path) as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            name, _, fields = line.strip().partition(":")
+            options = {}
+            for field in fields.split(":"):
+                key, _, value = field.partition("=")
+                options[key.strip()] = value.strip()
+            type_ = INPUT_TYPES.get(options.get("type"), str)
+            default = options.get("default")
+            if default is not None:
+                default = type_(float(default)) if type_ is int else type_(default)
+            definitions[name.strip()] = (type_, default)
+    return definitions
+
+
+def read_stdout(path):
+    """Parse a pyspg .stdout file, returns the list of output names."""
+    with open(path) as f:
+        return [line.partition(":")[0].strip() for line in f if line.strip()]
+
+
+def parse_value(value, type_=None):
+    if type_ is int:
+        return int(float(value))
+    if type_ is not None:
+        return type_(value)
+    for type_ in (int, float):
+        try:
+            return type_(value)
+        except ValueError:
+            pass
+    return value
+
+
+def read_spg(path, definitions=None):
+    """Parse a pyspg .spg file.
+    Supported lines are:
+    - @execute command
+    - :name value,              a constant
+    - .name value value ...,    a list of values
+    - +name start stop step,    values from start to stop, stop included
+    - *name start stop factor,  values from start to stop, multiplying
+    INPUT:
+    - path,         path of the .spg file
+    - definitions,  dict returned by read_input, for the types
+    Returns the command and the lists [(name, values)] of the constants
+    and of the variables, in order of the file.
+    """
+    if definitions is None:
+        definitions = {}
+    command = None
+    constants = []
+    variables = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            kind, (name, *values) = line[0], line[1:].split()
+            if kind == "@":
+                command = values[0]
+                continue
+            type_ = definitions.get(name, (None, None))[0]
+            if kind in "+*":
+                start, stop, step = [float(v) for v in values]
+                values = []
+                value = start
+                # a small tolerance keeps stop despite rounding errors
+                while value <= stop + 1e-9*abs(stop):
+                    values.append(value)
+                    value = value + step if kind == "+" else value*step
+                values = [parse_value(v, type_) for v in values]
+            elif kind in ":.":
+                values = [parse_value(v, type_) for v in values]
+            else:
+                raise ValueError("unknown line in %s: %r" % (path, line))
+            if kind == ":":
+                constants.append((name, values))
+            else:
+                variables.append((name, values))
+    return command, constants, variables
+
+
+class Sweep:
+    """The (parameters x repetitions) tasks of a .spg file.
+    Each task has an index and a seed: the seed of task i is drawn
+    from the i-th child of SeedSequence(seed), so it does not depend on
+    which tasks run, or in which order.
+    The results are written in a csv file, or a parquet dataset, named
+    after the .spg file, with the variables, the outputs and the
+    provenance of each run: its task index, seed, wall time in seconds,
+    number of events and peak resident memory in bytes during the run
+    (on linux, None elsewhere).
+    INPUT:
+    - spg_path,     path of the .spg file
+    - repeat,       int, number of repetitions of each set of parameters
+    - seed,         int, root seed of the sweep, random if None
+    - input_path,   path of the .input file, found from the
+                    @execute line if None
+    - stdout_path,  path of the .stdout file, found from the
+                    @execute line if None
+    - format,       "csv" or "parquet"
+    """
+
+    def __init__(self, spg_path, repeat=1, seed=None, input_path=None,
+                 stdout_path=None, format="csv"):
+        self.spg_path = spg_path
+        self.repeat = repeat
+        self.seed_sequence = np.random.SeedSequence(seed)
+        with open(spg_path) as f:
+            command = next(l.split()[1] for l in f if l.startswith("@"))
+        base = os.path.splitext(
+            os.path.join(os.path.dirname(spg_path), command))[0]
+        self.definitions = read_input(input_path or base + ".input")
+        self.outputs = read_stdout(stdout_path or base + ".stdout")
+        _, self.constants, self.variables = read_spg(spg_path,
+                                                     self.definitions)
+        self.format = format
+        self.results_path = os.path.splitext(spg_path)[0] + "." + format
+        self.columns = ([name for name, _ in self.variables] + self.outputs
+                        + PROVENANCE)
+
+    def parameters(self):
+        """Yields the sets of parameters, the last variable changing
+        fastest, like pyspg.
+        """
+        base = {name: default
+                for name, (_, default) in self.definitions.items()}
+        base.update((name, values[0]) for name, values in self.constants)
+        names = [name for name, _ in self.variables]
+        for values in itertools.product(*[v for _, v in self.variables]):
+            parameters = dict(base)
+            parameters.update(zip(names, values))
+            yield parameters
+
+    def tasks(self):
+        """Returns the list of tasks as (index, parameters, seed)."""
+        tasks = []
+        for parameters in self.parameters():
+            for _ in range(self.repeat):
+                # the same child as self.seed_sequence.spawn would give
+                child = np.random.SeedSequence(
+                    self.seed_sequence.entropy, spawn_key=(len(tasks),))
+                seed = int(child.generate_state(1, np.uint32)[0])
+                tasks.append((len(tasks), parameters, seed))
+        return tasks
+
+    def writer(self):
+        """Returns the writer of the results file."""
+        return WRITERS[self.format](self.results_path, self.columns)
+
+    def done(self):
+        """Returns the set of the indices of the tasks in the results file.
+        """
+        with self.writer() as writer:
+            return writer.done()
+
+    def run(self, function=simulate, workers=None, chunksize=1,
+            rewrite=False):
+        """Run the tasks not in the results file and append their results,
+        as they are done.
+        INPUT:
+        - function,     function(parameters, seed) returning a dict
+                        with the outputs, and optionally n_events,
+                        must be picklable
+        - workers,      int, number of processes, all cpus if None
+        - chunksize,    int, number of tasks sent at once to a process;
+                        at most two chunks per process are in flight
+        - rewrite,      bool, if True the results file is overwritten,
+                        otherwise the tasks in it are skipped
+        """
+        if rewrite and os.path.isdir(self.results_path):
+            shutil.rmtree(self.results_path)
+        elif rewrite and os.path.exists(self.results_path):
+            os.remove(self.results_path)
+        names = [name for name, _ in self.variables]
+        with self.writer() as writer, \
+                concurrent.futures.ProcessPoolExecutor(workers) as executor:
+            done = writer.done()
+            tasks = (task for task in self.tasks() if task[0] not in done)
+            chunks = iter(lambda: list(itertools.islice(tasks, chunksize)), [])
+            # chunks in flight, so that the results of the chunks done
+            # are released once written
+            window = 2*(workers or os.cpu_count() or 1)
+            pending = set()
+            # the results of the other chunks are kept if one fails
+            error = None
+            while True:
+                for chunk in itertools.islice(chunks, window - len(pending)):
+                    pending.add(executor.submit(_run_chunk, function, chunk))
+                if not pending:
+                    break
+                finished, pending = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in finished:
+                    if future.exception() is not None:
+                        error = error or future.exception()
+                        continue
+                    for parameters, results, provenance in future.result():
+                        row = {name: parameters[name] for name in names}
+                        row.update((name, results[name]) for name in self.outputs)
+                        row.update(provenance)
+                        writer.write(row)
+        if error is not None:
+            raise error
+        return self.results_path
+
+
+def _reset_peak_memory():
+    """Reset the peak resident memory of the process, so that
+    _peak_memory measures from now on.
+    Returns False if it cannot be reset (only linux can).
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        return False
+    return True
+
+
+def _peak_memory():
+    """Peak resident memory of the process in bytes since the last
+    _reset_peak_memory, from /proc/self/status.
+    """
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                # in kilobytes
+                return int(line.split()[1])*1024
+    return None
+
+
+def _run_chunk(function, chunk):
+    rows = []
+    for index, parameters, seed in chunk:
+        # the peak of the run, not of the runs before it in the worker
+        measure_memory = _reset_peak_memory()
+        start = time.perf_counter()
+        results = function(parameters, seed)
+        provenance = {
+            "task": index,
+            "seed": seed,
+            "wall_time": time.perf_counter() - start,
+            "n_events": results.get("n_events"),
+            "peak_memory": _peak_memory() if measure_memory else None,
+            }
+        rows.append((parameters, results, provenance))
+    return rows
+
+
+class CsvResultsWriter:
+    """Appends rows of results to a csv file, in blocks of buffer_size
+    rows, or every flush_interval seconds.
+    INPUT:
+    - path,             path of the csv file
+    - columns,          list of the names of the columns
+    - buffer_size,      int, number of rows kept before writing
+    - flush_interval,   float, seconds after which the rows are written
+    """
+
+    def __init__(self, path, columns, buffer_size=64, flush_interval=10.):
+        self.path = path
+        self.columns = columns
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self.last_flush = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+    def done(self):
+        """Returns the set of the tasks in the file.
+        A line cut by a crash is removed.
+        """
+        if not os.path.exists(self.path):
+            return set()
+        with open(self.path, "rb+") as f:
+            content = f.read()
+            f.truncate(content.rfind(b"\n") + 1)
+        with open(self.path, newline="") as f:
+            reader = csv.DictReader(f)
+            if reader.fieldnames is None:
+                return set()
+            if reader.fieldnames != self.columns:
+                raise ValueError("%s has columns %s, expected %s" % (
+                    self.path, reader.fieldnames, self.columns))
+            return {int(row["task"]) for row in reader}
+
+    def write(self, row):
+        """Add a row, a dict {column: value}."""
+        self.buffer.append([row[name] for name in self.columns])
+        if (len(self.buffer) >= self.buffer_size
+                or time.monotonic() - self.last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        self.last_flush = time.monotonic()
+        if not self.buffer:
+            return
+        with open(self.path, "a", newline="") as f:
+            writer = csv.writer(f)
+            if f.tell() == 0:
+                writer.writerow(self.columns)
+            writer.writerows(self.buffer)
+        self.buffer = []
+
+
+class ParquetResultsWriter(CsvResultsWriter):
+    """Appends rows of results to a parquet dataset, a directory with
+    a file for each block of rows, which pandas.read_parquet reads
+    as a single table. Needs pyarrow.
+    """
+
+    def done(self):
+        import pyarrow.parquet as pq
+
+        if not os.path.isdir(self.path):
+            return set()
+        return set(pq.read_table(self.path, columns=["task"])
+                   .column("task").to_pylist())
+
+    def flush(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.last_flush = time.monotonic()
+        if not self.buffer:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        table = pa.Table.from_pylist(
+            [dict(zip(self.columns, row)) for row in self.buffer])
+        # the files are written atomically, and read in name order
+        name = "part-%d-%d.parquet" % (time.time_ns(), os.getpid())
+        tmp = os.path.join(self.path, "." + name)
+        pq.write_table(table, tmp)
+        os.replace(tmp, os.path.join(self.path, name))
+        self.buffer = []
+
+
+WRITERS = {"csv": CsvResultsWriter, "parquet": ParquetResultsWriter}
@@ -0,0 +1,51 @@
+"""Module providing Function to change path"""
+import os
+import sys
+import tempfile
+sys.path.append("../")
+import eth_base as sample
+import networkx as nx
+
+
+##################
+# actual testing
+
+def test_0():
+    """Gossip on the edges left out by the active mode changes nothing
+    """
+    model = sample.Model(graph=nx.random_regular_graph(3, 10, seed=2),
+                         tau_block=3, tau_attest=1, delay_share=0.3,
+                         delay_time=4, seed=7, gossip_mode="active")
+    with tempfile.TemporaryDirectory() as path:
+        file_name = os.path.join(path, "model.ckpt")
+        for stoping_time in [5, 17, 30, 41, 62]:
+            model.run(stoping_time)
+            model.checkpoint(file_name)
+            for p, process in enumerate(model.processes):
+                inactive = [e for e in range(process.num_edges)
+                            if process.active_position[e] < 0]
+                for e in inactive:
+                    copy = sample.Model.from_checkpoint(file_name)
+                    copy_process = copy.processes[p]
+                    listener = copy_process.peers[copy_process.listeners[e]]
+                    gossiper = copy_process.peers[copy_process.gossipers[e]]
+                    version = listener.version()
+                    copy_process.transfer(gossiper, listener)
+                    assert(listener.version() == version)
+
+
+def test_1():
+    """The active mode runs fewer events, and the same blocks
+    """
+    model, active = [
+        sample.Model(graph=nx.random_regular_graph(3, 10, seed=2),
+                     tau_block=3, tau_attest=1, delay_share=0.3,
+                     delay_time=4, seed=7, gossip_mode=gossip_mode)
+        for gossip_mode in ["all", "active"]]
+    model.run(240)
+    active.run(240)
+
+    assert(active.n_events < model.n_events)
+    assert(abs(len(active.blockchain) - len(model.blockchain)) <= 3)
+    assert(sum(p.lam for p in active.processes)
+           <= sum(p.lam for p in model.processes))
@@ -0,0 +1,55 @@
+"""Module providing Function to change path"""
+import sys
+import numpy as np
+import networkx as nx
+sys.path.append("../")
+import eth_base as sample
+
+
+def full_gossip(gossiping_node, listening_node):
+    listening_node.receive_attestations(gossiping_node.attestation_blocks,
+                                        gossiping_node.attestation_slots)
+
+
+##################
+# actual testing
+
+def test_0():
+    "Gossiping the changed attestations gives the views of full gossip"
+    model, full = [
+        sample.Model(graph=nx.random_regular_graph(4, 20, seed=3),
+                     tau_block=1, tau_attest=0.3, delay_share=0.5,
+                     delay_time=4, seed=4)
+        for _ in range(2)]
+    model.run(80)
+    full.attestation_gossip_process.transfer = full_gossip
+    full.run(80)
+
+    assert(model.n_events == full.n_events)
+    assert((model.attestation_blocks == full.attestation_blocks).all())
+    assert((model.attestation_slots == full.attestation_slots).all())
+
+
+def test_1():
+    "Only the attestations changed since the last gossip are sent"
+    model = sample.Model(graph=nx.random_regular_graph(4, 20, seed=3),
+                         tau_block=1, tau_attest=0.3, delay_share=0.5,
+                         delay_time=4, seed=4)
+    n0, n1 = model.edges[0]
+    received = []
+    receive_attestations = n1.receive_attestations
+
+    def receive(blocks, slots, validators=None):
+        received.append(None if validators is None else validators.tolist())
+        receive_attestations(blocks, slots, validators)
+    n1.receive_attestations = receive
+
+    n0.gossip_attestations(n1)
+    n0.gossip_attestations(n1)
+    n0.set_attestation(5, 0, 2)
+    n1.set_attestation(7, 0, 1)
+    n0.gossip_attestations(n1)
+
+    assert(received == [None, [5, 7]])
+    assert(n1.attestation_slots[5] == 2 and n1.attestation_slots[7] == 1)
+    assert(np.count_nonzero(n1.attestation_slots >= 0) == 2)
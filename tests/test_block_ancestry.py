@@ -0,0 +1,41 @@
+"""Module providing Function to change path"""
+import sys
+import numpy as np
+sys.path.append("../")
+import eth_base as sample
+
+
+##################
+# actual testing
+
+def test_0():
+    "Skip pointers agree with the parent pointers"
+    rng = np.random.default_rng(0)
+    blocks = [sample.Block()]
+    for i in range(1, 500):
+        if rng.random() < 0.8:
+            parent = blocks[-1]
+        else:
+            parent = blocks[rng.integers(len(blocks))]
+        blocks.append(sample.Block(parent=parent, slot_no=i))
+
+    for _ in range(500):
+        a = blocks[rng.integers(len(blocks))]
+        b = blocks[rng.integers(len(blocks))]
+        assert(a.is_ancestor_of(b) == (a in b.predecessors))
+        height = rng.integers(b.height + 1)
+        assert(b.get_ancestor(height) is b.main_chain()[b.height - height])
+
+
+def test_1():
+    "Simple test"
+    B0 = sample.Block(emitter="genesis", parent=None, slot_no=0)
+    B1 = sample.Block(emitter="genesis", parent=B0, slot_no=1)
+    B2 = sample.Block(emitter="genesis", parent=B1, slot_no=2)
+    B3 = sample.Block(emitter="genesis", parent=B1, slot_no=3)
+
+    assert(B2.predecessors == {B0, B1, B2})
+    assert(B0.is_ancestor_of(B3))
+    assert(B3.is_ancestor_of(B3))
+    assert(not B2.is_ancestor_of(B3))
+    assert(B3.get_ancestor(4) is None)
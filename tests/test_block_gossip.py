@@ -0,0 +1,30 @@
+"""Module providing Function to change path"""
+import sys
+import networkx as nx
+sys.path.append("../")
+import eth_base as sample
+
+
+##################
+# actual testing
+
+def test_0():
+    "Only blocks not yet gossiped on an edge are sent"
+    model = sample.Model(graph=nx.path_graph(3), tau_block=1, tau_attest=1,
+                         seed=0)
+    n0, n1, n2 = model.nodes
+    n0.propose_block()
+    n0.propose_block()
+
+    n0.gossip(n1)
+    assert(n1.local_blockchain == n0.local_blockchain)
+    assert(n0.gossiped_blocks[n1] == 3)
+
+    received = []
+    n1.listen = lambda node, blocks: received.append(list(blocks))
+    n0.gossip(n1)
+    assert(received == [[]])
+
+    n1.gossip(n2)
+    assert(n2.block_log == n0.block_log)
+    assert(n2.fork_choice.head() is model.blockchain[-1])
@@ -0,0 +1,61 @@
+"""Module providing Function to change path"""
+import sys
+import numpy as np
+sys.path.append("../")
+import eth_base as sample
+
+
+def make_table(n_blocks):
+    genesis = sample.Block()
+    for i in range(1, n_blocks):
+        sample.Block(parent=genesis.table[i//2])
+    return genesis.table
+
+
+##################
+# actual testing
+
+def test_0():
+    "A BlockSet behaves like the set of its blocks"
+    table = make_table(30)
+    blocks = sample.BlockSet(table, [table[0], table[9], table[17]])
+    blocks.add(table[9])
+    blocks.add(table[25])
+    blocks.discard(table[17])
+
+    assert(len(blocks) == 3)
+    assert(table[25] in blocks and table[17] not in blocks)
+    assert(list(blocks) == [table[0], table[9], table[25]])
+    assert(blocks == {table[0], table[9], table[25]})
+    assert(blocks <= set(table))
+    assert(sorted(blocks - {table[9]}, key=lambda b: b.id)
+           == [table[0], table[25]])
+
+
+def test_1():
+    "Union and equality work on the bits, whatever their capacity"
+    table = make_table(100)
+    small = sample.BlockSet(table, [table[0], table[3]])
+    large = sample.BlockSet(table, [table[3], table[99]])
+    large.discard(table[99])
+
+    assert(len(small.bits) < len(large.bits))
+    assert(large != small)
+    large.add(table[0])
+    assert(large == small and small == large)
+
+    union = small | sample.BlockSet(table, [table[64]])
+    small.update(sample.BlockSet(table, [table[64], table[70]]))
+    assert(union == {table[0], table[3], table[64]})
+    assert(len(small) == 4 and table[70] in small)
+
+
+def test_2():
+    "The ids of blocks are tested one at a time or as an array"
+    table = make_table(20)
+    blocks = sample.BlockSet(table, [table[0], table[8], table[11]])
+
+    assert(blocks.has(8) and not blocks.has(9) and not blocks.has(200))
+    ids = np.array([11, 0, 19, 8, 1])
+    assert(blocks.has(ids).tolist() == [True, True, False, True, False])
+    assert(blocks.ids().tolist() == [0, 8, 11])
@@ -0,0 +1,49 @@
+"""Module providing Function to change path"""
+import sys
+sys.path.append("../")
+import eth_base as sample
+
+
+class Emitter:
+    def __init__(self, id, delayer):
+        self.id = id
+        self.delayer = delayer
+
+
+##################
+# actual testing
+
+def test_0():
+    "Blocks register in the table of their blocktree"
+    genesis = sample.Block()
+    delayer = Emitter(3, True)
+    block_1 = sample.Block(emitter=Emitter(2, False), parent=genesis, slot_no=1)
+    block_2 = sample.Block(emitter=delayer, parent=block_1, slot_no=2)
+    block_3 = sample.Block(emitter=delayer, parent=block_1, slot_no=3)
+
+    table = genesis.table
+    assert(block_3.table is table)
+    assert([b.id for b in table] == [0, 1, 2, 3])
+    assert(table[2] is block_2)
+    assert(table.parent.tolist() == [-1, 0, 1, 1])
+    assert(table.height.tolist() == [0, 1, 2, 2])
+    assert(table.slot.tolist() == [0, 1, 2, 3])
+    assert(table.emitter.tolist() == [-1, 2, 3, 3])
+    assert(table.delayer.tolist() == [False, False, True, True])
+
+
+def test_1():
+    "Metrics give the same results on the table and on the blocks"
+    genesis = sample.Block()
+    blocks = [genesis]
+    for i in range(1, 2000):
+        parent = blocks[i - 1] if i % 5 else blocks[i // 2]
+        blocks.append(sample.Block(parent=parent, slot_no=i))
+    attestations = {1: (blocks[-1], 0), 2: (blocks[1500], 0)}
+
+    for metric in [sample.calculate_mainchain_rate,
+                   sample.calculate_branch_ratio]:
+        assert(metric(genesis.table, attestations)
+               == metric(blocks, attestations))
+    assert(sample.calculate_entropy(genesis.table)
+           == sample.calculate_entropy(blocks))
@@ -0,0 +1,72 @@
+"""Module providing Function to change path"""
+import os
+import sys
+import tempfile
+sys.path.append("../")
+import eth_base as sample
+import networkx as nx
+
+
+##################
+# actual testing
+
+def test_0():
+    """Metrics of a loaded blocktree are the metrics of the model
+    """
+    model = sample.Model(
+        graph=nx.random_regular_graph(4, 20, seed=1),
+        tau_block=3,
+        tau_attest=1,
+        delay_share=0.3,
+        delay_time=4,
+        seed=5)
+    model.run(100)
+
+    with tempfile.TemporaryDirectory() as path:
+        model.dump_blockchain_data(os.path.join(path, "blocktree"))
+        table, attestations = sample.load_blocktree(
+            os.path.join(path, "blocktree.npz"))
+        full_table, _ = sample.load_blocktree(
+            os.path.join(path, "blocktree.npz"), block_attestations=True)
+
+    for name, _ in sample.BlockTable.COLUMNS:
+        assert((table.column(name) == model.blockchain.column(name)).all())
+    assert(table[5].attestations is None)
+    assert((full_table[5].attestations[1]
+            == model.blockchain[5].attestations[1]).all())
+
+    results = model.results()
+    assert(sample.calculate_mainchain_rate(table, attestations)
+           == results["mainchain_rate"])
+    assert(sample.calculate_branch_ratio(table, attestations)
+           == results["branch_ratio"])
+    assert(sample.calculate_entropy(table) == results["blocktree_entropy"])
+    assert(sample.calculate_delayer_orphan_rate(table, attestations)
+           == results["delayer_orphan_rate"])
+    assert(len(sample.blockchain_to_digraph(table))
+           == len(sample.blockchain_to_digraph(model.blockchain)))
+
+
+def test_1():
+    """Blocktrees without attestations are saved and checkpointed
+    """
+    genesis = sample.Block()
+    sample.Block(parent=sample.Block(parent=genesis))
+    model = sample.Model(graph=nx.path_graph(4), tau_block=1, tau_attest=1,
+                         seed=1)
+
+    with tempfile.TemporaryDirectory() as path:
+        file_name = os.path.join(path, "blocktree.npz")
+        sample.save_blocktree(file_name, sample.Block().table)
+        table, attestations = sample.load_blocktree(file_name)
+        assert(len(table) == 1 and attestations is None)
+
+        sample.save_blocktree(file_name, genesis.table)
+        table, _ = sample.load_blocktree(file_name, block_attestations=True)
+        assert(table.column("parent").tolist()
+               == genesis.table.column("parent").tolist())
+
+        model.checkpoint(os.path.join(path, "model.ckpt"))
+        resumed = sample.Model.from_checkpoint(os.path.join(path, "model.ckpt"))
+    assert(len(resumed.blockchain) == 1)
+    resumed.run(30)
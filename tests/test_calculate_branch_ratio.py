@@ -54,3 +54,27 @@ def test_0():
 
     # testing
     assert(sample.calculate_branch_ratio(mock_blockchain, mock_attestations) == 1/3)
+
+
+def test_1():
+    """Test with a given head
+    """
+    genesis = sample.Block()
+    blocks = [genesis]
+    for i in range(1, 300):
+        parent = blocks[i - 1] if i % 3 else blocks[i - 2]
+        blocks.append(sample.Block(parent=parent, slot_no=i))
+    head = blocks[-1]
+    attestations = {1: (head, 0)}
+
+    # count pairs of mainchain and orphan blocks sharing the parent
+    main_chain = set(head.main_chain())
+    counter = 0
+    for block in main_chain:
+        for orphan in set(blocks) - main_chain:
+            if block.parent == orphan.parent:
+                counter += 1
+
+    ratio = sample.calculate_branch_ratio(blocks, attestations, head=head)
+    assert(ratio == counter/len(main_chain))
+    assert(ratio == sample.calculate_branch_ratio(genesis.table, attestations))
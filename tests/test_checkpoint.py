@@ -0,0 +1,64 @@
+"""Module providing Function to change path"""
+import os
+import sys
+import tempfile
+import pytest
+sys.path.append("../")
+import eth_base as sample
+import networkx as nx
+
+
+##################
+# actual testing
+
+@pytest.mark.parametrize("rng_mode", ["legacy", "batched"])
+def test_0(rng_mode):
+    """A run resumed from a checkpoint is the same run
+    """
+    model, interrupted = [
+        sample.Model(graph=nx.random_regular_graph(4, 20, seed=1),
+                     tau_block=3, tau_attest=1, delay_share=0.3,
+                     delay_time=4, seed=5, rng_mode=rng_mode)
+        for _ in range(2)]
+    model.run(120)
+
+    with tempfile.TemporaryDirectory() as path:
+        file_name = os.path.join(path, "model.ckpt")
+        interrupted.run(70, checkpoint_path=file_name,
+                        checkpoint_interval=50)
+        resumed = sample.Model.from_checkpoint(file_name)
+
+    assert(50 <= resumed.time < 70)
+    resumed.run(120)
+    assert(resumed.time == model.time)
+    assert(resumed.n_events == model.n_events)
+    assert(len(resumed.blockchain) == len(model.blockchain))
+    assert((resumed.attestation_slots == model.attestation_slots).all())
+    assert(resumed.results() == model.results())
+    for node, resumed_node in zip(model.nodes, resumed.nodes):
+        assert(node.use_lmd_ghost().id == resumed_node.use_lmd_ghost().id)
+
+
+def test_1():
+    """Blocks are rebuilt with their links
+    """
+    model = sample.Model(graph=nx.random_regular_graph(4, 20, seed=1),
+                         tau_block=3, tau_attest=1, delay_share=0.3,
+                         delay_time=4, seed=5)
+    model.run(100)
+    with tempfile.TemporaryDirectory() as path:
+        file_name = os.path.join(path, "model.ckpt")
+        model.checkpoint(file_name)
+        resumed = sample.Model.from_checkpoint(file_name)
+
+    for block, resumed_block in zip(model.blockchain, resumed.blockchain):
+        assert(block.id == resumed_block.id)
+        assert(getattr(block.parent, "id", None)
+               == getattr(resumed_block.parent, "id", None))
+        assert([b.id for b in block.children]
+               == [b.id for b in resumed_block.children])
+        assert(getattr(block.emitter, "id", None)
+               == getattr(resumed_block.emitter, "id", None))
+    assert((resumed.blockchain.delayer == model.blockchain.delayer).all())
+    assert(resumed.nodes[0].model is resumed)
+    assert(resumed.blockchain[3].emitter in resumed.nodes)
@@ -0,0 +1,115 @@
+"""Module providing Function to change path"""
+import sys
+import numpy as np
+import networkx as nx
+sys.path.append("../")
+import eth_base as sample
+
+
+##################
+# actual testing
+
+def test_0():
+    "The Fenwick tree finds the index of a value among prefix sums"
+    rng = np.random.default_rng(0)
+    weights = rng.random(37).tolist()
+    tree = sample.FenwickTree(weights)
+    for i in rng.integers(37, size=200).tolist():
+        weights[i] = 0. if rng.random() < 0.3 else float(rng.random())
+        tree.update(i, weights[i])
+
+    cumulative = np.cumsum(weights)
+    assert(np.isclose(tree.total, cumulative[-1]))
+    for value in rng.random(500)*cumulative[-1]:
+        index = int(np.searchsorted(cumulative, value, side="right"))
+        assert(tree.find(value) == index)
+        assert(weights[index] > 0)
+
+
+def test_1():
+    "A tree of zero weights has zero total, after updates too"
+    tree = sample.FenwickTree([0.1, 0.2, 0.3])
+    for i in range(3):
+        tree.update(i, 0.)
+
+    assert(tree.total == 0)
+    tree.update(1, 2.)
+    assert(tree.total == 2.)
+    assert(tree.draw(0.999) == 1)
+
+
+def test_2():
+    "The alias table draws indices with the frequencies of the weights"
+    weights = np.array([1., 0., 3., 0.5, 5.5])
+    table = sample.AliasTable(weights)
+    drawn = table.draw(np.random.default_rng(2).random(200000))
+
+    frequencies = np.bincount(drawn, minlength=len(weights))/len(drawn)
+    assert(frequencies[1] == 0)
+    assert(np.allclose(frequencies, weights/weights.sum(), atol=0.005))
+
+
+def test_3():
+    "Latency attributes of the graph set the rates of the edges"
+    graph = nx.path_graph(3)
+    graph.nodes[0]["latency"] = 2.
+    graph.edges[1, 2]["latency"] = 4.
+    model = sample.Model(graph=graph, tau_block=1, tau_attest=0.5,
+                         delay_share=0.5, seed=0, latency="latency")
+
+    rates = {(n.id, k.id): r for (n, k), r in zip(
+        model.edges, model.block_gossip_process.edge_rates)}
+    assert(rates == {(0, 1): 0.5, (1, 0): 0.5, (1, 2): 0.25, (2, 1): 0.25})
+    assert(np.isclose(model.attestation_gossip_process.lam, 3.))
+    model.run(30)
+    assert(model.time >= 30)
+
+
+def test_4():
+    "The active edges are drawn with their rates"
+    graph = nx.random_regular_graph(3, 10, seed=2)
+    for n, k in graph.edges():
+        graph.edges[n, k]["latency"] = 1. + (n + k) % 3
+    model = sample.Model(graph=graph, tau_block=3, tau_attest=1,
+                         delay_share=0.5, seed=1, latency="latency",
+                         gossip_mode="active")
+    model.run(60)
+
+    for process in model.processes:
+        active = [e for e in range(process.num_edges)
+                  if process.active_position[e] >= 0]
+        assert(np.isclose(process.lam,
+                          sum(process.edge_rates[e] for e in active)))
+
+
+def test_5():
+    "Draws at the ends of [0, 1) skip the zero weights left by updates"
+    tree = sample.FenwickTree([0.1, 0.2, 0.3, 0.0])
+    tree.update(0, 0.)
+    tree.update(1, 0.)
+
+    assert(tree.draw(0.0) == 2)
+    assert(tree.draw(1 - 2**-53) == 2)
+
+    rng = np.random.default_rng(5)
+    tree = sample.FenwickTree(rng.random(50).tolist())
+    for i in rng.permutation(50)[:45].tolist():
+        tree.update(i, 0.)
+    for uniform in [0.0, 1 - 2**-53] + rng.random(100).tolist():
+        assert(tree[tree.draw(uniform)] > 0)
+
+
+def test_6():
+    "Deactivating an inactive edge leaves the active edges unchanged"
+    model = sample.Model(graph=nx.cycle_graph(4), tau_block=1, tau_attest=1,
+                         seed=0, gossip_mode="active")
+    process = model.block_gossip_process
+    for e in [0, 1, 4, 5, 6, 7]:
+        process.deactivate(e)
+    process.deactivate(0)
+
+    assert(sorted(process.active_edges) == [2, 3])
+    assert([process.active_position[e] >= 0 for e in range(8)]
+           == [False, False, True, True, False, False, False, False])
+    assert([process.active_edges[process.active_position[e]]
+            for e in [2, 3]] == [2, 3])
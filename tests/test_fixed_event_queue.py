@@ -0,0 +1,59 @@
+"""Module providing Function to change path"""
+import pickle
+import sys
+sys.path.append("../")
+import eth_base as sample
+
+
+class Recorder(sample.FixedTimeEvent):
+    def __init__(self, name, log, interval, offset=0):
+        super().__init__(interval, offset=offset)
+        self.name = name
+        self.log = log
+
+    def event(self):
+        self.log.append((self.name, self.next_event))
+
+
+##################
+# actual testing
+
+def test_0():
+    "All events due in a long increment fire, in time order"
+    log = []
+    slot = Recorder("slot", log, 12)
+    attestation = Recorder("attestation", log, 12, offset=4)
+    late = Recorder("late", log, float("inf"), offset=float("inf"))
+    queue = sample.FixedEventQueue([slot, attestation, late])
+
+    late.schedule(30)
+    queue.trigger(35)
+
+    assert(log == [("slot", 0), ("attestation", 4), ("slot", 12),
+                   ("attestation", 16), ("slot", 24), ("attestation", 28),
+                   ("late", 30)])
+    assert(queue.next_time() == 36)
+    assert(slot.counter == 3)
+
+
+def test_1():
+    "Events at the same time fire in the given order"
+    log = []
+    events = [Recorder(i, log, 12) for i in range(3)]
+    queue = sample.FixedEventQueue(events)
+    queue.trigger(0)
+    assert(log == [(0, 0), (1, 0), (2, 0)])
+
+
+def test_2():
+    "A pickled queue holds only plain objects and resumes where it was"
+    log = []
+    events = [Recorder(i, log, 12, offset=i) for i in range(2)]
+    queue = sample.FixedEventQueue(events)
+    queue.trigger(20)
+    assert(isinstance(queue._FixedEventQueue__pushes, int))
+
+    copy = pickle.loads(pickle.dumps(queue))
+    queue.trigger(40)
+    copy.trigger(40)
+    assert(copy.events[0].log == log)
@@ -0,0 +1,51 @@
+"""Module providing Function to change path"""
+import sys
+import numpy as np
+sys.path.append("../")
+import eth_base as sample
+
+
+##################
+# actual testing
+
+def test_0():
+    "Store head matches lmd_ghost while blocks and votes arrive"
+    rng = np.random.default_rng(42)
+    genesis = sample.Block()
+    blockchain = {genesis}
+    blocks = [genesis]
+    store = sample.ForkChoiceStore(genesis)
+    attestations = {}
+
+    for i in range(200):
+        if rng.random() < 0.3:
+            parent = blocks[rng.integers(len(blocks))]
+            block = sample.Block(parent=parent, slot_no=i)
+            blocks.append(block)
+            blockchain.add(block)
+            store.add_block(block)
+        validator = int(rng.integers(10))
+        attestations[validator] = (blocks[rng.integers(len(blocks))], i)
+        store.on_attestation(validator, attestations[validator][0])
+
+        assert(store.head() is sample.lmd_ghost(blockchain, attestations))
+
+
+def test_1():
+    "Moving a vote back and forth restores the weights"
+    B0 = sample.Block(emitter="genesis", parent=None, slot_no=0)
+    B1 = sample.Block(emitter="genesis", parent=B0, slot_no=1)
+    B2 = sample.Block(emitter="genesis", parent=B0, slot_no=2)
+    B3 = sample.Block(emitter="genesis", parent=B2, slot_no=3)
+
+    store = sample.ForkChoiceStore(B0)
+    for b in [B1, B2, B3]:
+        store.add_block(b)
+
+    store.on_attestation("a", B1)
+    weights = store.weights.copy()
+    store.on_attestation("a", B3)
+    assert(store.head() is B3)
+    store.on_attestation("a", B1)
+    assert(store.weights == weights)
+    assert(store.head() is B1)
@@ -0,0 +1,35 @@
+"""Module providing Function to change path"""
+import sys
+import numpy as np
+sys.path.append("../")
+import eth_base as sample
+
+
+##################
+# actual testing
+
+def test_0():
+    "Batched mode is reproducible and follows the process rates"
+    processes = [sample.Process(1.), sample.Process(1/3)]
+    draws = []
+    for _ in range(2):
+        gillespie = sample.Gillespie(processes, np.random.default_rng(0),
+                                     rng_mode="batched", batch_size=1000)
+        draws.append([(gillespie.calculate_time_increment(),
+                       gillespie.select_event()) for _ in range(5000)])
+
+    assert(draws[0] == draws[1])
+    increments = np.array([d[0] for d in draws[0]])
+    share = np.mean([d[1] is processes[1] for d in draws[0]])
+    assert(abs(increments.mean() - 1/4) < 0.02)
+    assert(abs(share - 3/4) < 0.02)
+
+
+def test_1():
+    "Rates changes are taken into account"
+    processes = [sample.Process(1.), sample.Process(1.)]
+    gillespie = sample.Gillespie(processes, np.random.default_rng(0),
+                                 rng_mode="batched")
+    processes[0].tau = np.inf
+    gillespie.update_lambdas()
+    assert(all(gillespie.select_event() is processes[1] for _ in range(100)))
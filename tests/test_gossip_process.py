@@ -0,0 +1,25 @@
+"""Module providing Function to change path"""
+import sys
+import numpy as np
+import networkx as nx
+sys.path.append("../")
+import eth_base as sample
+
+
+##################
+# actual testing
+
+def test_0():
+    "Edge sampling is reproducible and crosses batch boundaries"
+    model = sample.Model(graph=nx.cycle_graph(5), tau_block=1, tau_attest=1,
+                         seed=0)
+    drawn = []
+    for _ in range(2):
+        process = sample.BlockGossipProcess(1, model.edges,
+                                            rng=np.random.default_rng(1),
+                                            batch_size=7)
+        drawn.append([process.next_edge() for _ in range(20)])
+
+    assert(drawn[0] == drawn[1])
+    for gossiping_node, listening_node in drawn[0]:
+        assert((gossiping_node, listening_node) in model.edges)
@@ -0,0 +1,73 @@
+"""Module providing Function to change path"""
+import sys
+import networkx as nx
+sys.path.append("../")
+import eth_base as sample
+
+
+##################
+# actual testing
+
+def test_0():
+    "The head is recomputed only when the view changes"
+    model = sample.Model(graph=nx.path_graph(3), tau_block=1, tau_attest=1,
+                         seed=0)
+    n0, n1 = model.nodes[:2]
+    genesis = model.blockchain[0]
+
+    assert(n1.use_lmd_ghost() is genesis)
+    assert(n1.use_lmd_ghost() is genesis)
+    assert((n1.head_cache_hits, n1.head_cache_misses) == (1, 1))
+
+    n0.propose_block()
+    n0.gossip(n1)
+    assert(n1.use_lmd_ghost() is model.blockchain[1])
+    assert(model.head_cache_stats()["head_cache_misses"] >= 3)
+
+
+def test_1():
+    "The cache can be turned off and does not change the trajectory"
+    results = []
+    for cache_heads in [True, False]:
+        model = sample.Model(graph=nx.cycle_graph(6), tau_block=3,
+                             tau_attest=1, delay_share=0.5, delay_time=4,
+                             seed=1, cache_heads=cache_heads)
+        model.run(200)
+        results.append(model.results())
+
+    assert(results[0] == results[1])
+    assert(model.head_cache_stats() == {"head_cache_hits": 0,
+                                        "head_cache_misses": 0})
+
+
+def test_2():
+    "Moving the own vote off an ancestor of the head can change the head"
+    model = sample.Model(graph=nx.path_graph(3), tau_block=1, tau_attest=1,
+                         seed=0)
+    n0 = model.nodes[0]
+    genesis = model.blockchain[0]
+    A = sample.Block(emitter=n0, parent=genesis, slot_no=1)
+    X = sample.Block(emitter=n0, parent=genesis, slot_no=1)
+    H = sample.Block(emitter=n0, parent=A, slot_no=2)
+    for block in [A, X, H]:
+        n0.add_block(block)
+    n0.set_attestation(0, A.id, 1)
+    n0.set_attestation(1, X.id, 1)
+    assert(n0.use_lmd_ghost() is H)
+
+    n0.issue_attestation()
+    assert(n0.fork_choice.head() is X)
+    assert(n0.use_lmd_ghost() is X)
+
+
+def test_3():
+    "Runs with the same seeds give the same results with or without cache"
+    results = []
+    for cache_heads in [True, False]:
+        model = sample.Model(graph=nx.random_regular_graph(3, 16, seed=13),
+                             tau_block=40, tau_attest=20, delay_share=0.5,
+                             delay_time=9, seed=13, cache_heads=cache_heads)
+        model.run(1500)
+        results.append(model.results())
+
+    assert(results[0] == results[1])
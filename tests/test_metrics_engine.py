@@ -0,0 +1,49 @@
+"""Module providing Function to change path"""
+import sys
+sys.path.append("../")
+import eth_base as sample
+
+
+##################
+# actual testing
+
+def test_0():
+    """The engine gives the same metrics as the single functions
+    """
+    genesis = sample.Block()
+    blocks = [genesis]
+    for i in range(1, 200):
+        parent = blocks[i - 1] if i % 4 else blocks[i - 3]
+        blocks.append(sample.Block(parent=parent, slot_no=i))
+    attestations = {1: (blocks[-1], 0), 2: (blocks[-5], 0)}
+
+    engine = sample.MetricsEngine({
+        "mainchain_rate": sample.mainchain_rate,
+        "branch_ratio": sample.branch_ratio,
+        "blocktree_entropy": sample.blocktree_entropy,
+        })
+    results = engine.compute(blocks, attestations)
+
+    assert(list(results) == ["mainchain_rate", "branch_ratio",
+                             "blocktree_entropy"])
+    assert(results["mainchain_rate"]
+           == sample.calculate_mainchain_rate(blocks, attestations))
+    assert(results["branch_ratio"]
+           == sample.calculate_branch_ratio(blocks, attestations))
+    assert(results["blocktree_entropy"] == sample.calculate_entropy(blocks))
+
+
+def test_1():
+    """Registered metrics share the fork choice of the default ones
+    """
+    genesis = sample.Block()
+    block_1 = sample.Block(parent=genesis, slot_no=1)
+    block_2 = sample.Block(parent=genesis, slot_no=2)
+    attestations = {1: (block_2, 2)}
+
+    engine = sample.MetricsEngine({"mainchain_rate": sample.mainchain_rate})
+    engine.register("head", lambda stats: stats.head)
+    results = engine.compute([genesis, block_1, block_2], attestations)
+
+    assert(results["head"] == block_2)
+    assert(results["mainchain_rate"] == 2/3)
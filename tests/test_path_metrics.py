@@ -0,0 +1,39 @@
+"""Module providing Function to change path"""
+import sys
+import numpy as np
+sys.path.append("../")
+import eth_base as sample
+import networkx as nx
+
+
+##################
+# actual testing
+
+def test_0():
+    """Exact metrics match networkx
+    """
+    net_p2p = nx.barabasi_albert_graph(200, 2, seed=3)
+    net = sample.Network(net_p2p)
+
+    assert(sample.calculate_diameter(net) == nx.diameter(net_p2p))
+    assert(sample.calculate_average_shortest_path(net)
+           == nx.average_shortest_path_length(net_p2p))
+
+
+def test_1():
+    """Sampled metrics are bounded by the exact ones
+    """
+    net_p2p = nx.barabasi_albert_graph(200, 2, seed=3)
+    net = sample.Network(net_p2p)
+    rng = np.random.default_rng(0)
+
+    diameter = nx.diameter(net_p2p)
+    assert(sample.calculate_diameter(net, "sampled", 10, rng=rng) <= diameter)
+    assert(sample.calculate_diameter(net, "double_sweep", rng=rng)
+           <= diameter)
+    # sampling every node gives the exact value
+    assert(sample.calculate_diameter(net, "sampled", 200, rng=rng)
+           == diameter)
+    average = sample.calculate_average_shortest_path(
+        net, "sampled", 10, tolerance=0, rng=rng)
+    assert(abs(average - nx.average_shortest_path_length(net_p2p)) < 1e-12)
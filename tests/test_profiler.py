@@ -0,0 +1,47 @@
+"""Module providing Function to change path"""
+import sys
+sys.path.append("../")
+import eth_base as sample
+import networkx as nx
+
+
+def run_model(**kwargs):
+    model = sample.Model(
+        graph=nx.random_regular_graph(3, 16, seed=4),
+        tau_block=2,
+        tau_attest=1,
+        delay_share=0.5,
+        delay_time=3,
+        seed=11,
+        **kwargs)
+    model.run(200)
+    return model
+
+
+##################
+# actual testing
+
+def test_0():
+    """Profiling does not change the run
+    """
+    model = run_model()
+    profiled = run_model(profile=True, snapshot_interval=50)
+    assert(model.results() == profiled.results())
+    assert("profile" not in model.stats())
+
+    stats = profiled.stats()
+    profile = stats["profile"]
+    counts = profile["counts"]
+    assert(stats["n_events"] == model.n_events)
+    assert(counts["BlockGossipProcess"] + counts["AttestationGossipProcess"]
+           == model.n_events)
+    # one block per slot, late proposals may be pending
+    assert(len(profiled.blockchain) - 1 <= counts["SlotBoundary"])
+    assert(0 < counts["LateProposal"] <= counts["SlotBoundary"])
+    assert(counts["views_are_synced"] == model.n_events)
+    assert(0 < profile["fast_forwards"] <= model.n_events)
+    assert(counts["fork_choice"] == stats["head_cache_misses"])
+    # the last step of the run may go past its end
+    assert([s["time"] // 50 for s in profile["snapshots"]][:3] == [1, 2, 3])
+    assert(profile["calls_per_second"]["SlotBoundary"]
+           == counts["SlotBoundary"]/profiled.time)
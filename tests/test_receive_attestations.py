@@ -0,0 +1,64 @@
+"""Module providing Function to change path"""
+import sys
+import numpy as np
+import networkx as nx
+sys.path.append("../")
+import eth_base as sample
+
+
+##################
+# actual testing
+
+def test_0():
+    "Merge keeps the newer slot and caches attestations to unknown blocks"
+    model = sample.Model(graph=nx.path_graph(4), tau_block=1, tau_attest=1,
+                         seed=0)
+    n0, n1 = model.nodes[:2]
+    n0.propose_block()
+    block = model.blockchain[-1]
+    n1.set_attestation(2, 0, 5)
+
+    blocks = np.array([0, block.id, 0, 0], dtype=np.int32)
+    slots = np.array([3, 3, 4, 3], dtype=np.int32)
+    n1.receive_attestations(blocks, slots)
+
+    assert(n1.attestation_slots.tolist() == [3, -1, 5, 3])
+    assert(n1.cached_attestations == {1: (block.id, 3)})
+    assert(n1.attestations[model.peers[0]] == (model.blockchain[0], 3))
+
+    # the block arrives and releases the cached attestation
+    n0.gossip(n1)
+    assert(n1.cached_attestations == {})
+    assert(n1.attestation_blocks[1] == block.id)
+    assert(n1.fork_choice.latest_messages[1] is block)
+
+
+def test_1():
+    "Cached attestations wait for their block, and are dropped once superseded"
+    model = sample.Model(graph=nx.path_graph(4), tau_block=1, tau_attest=1,
+                         seed=0)
+    n0, n1 = model.nodes[:2]
+    n0.propose_block()
+    first = model.blockchain[-1]
+    n0.propose_block()
+    second = model.blockchain[-1]
+
+    blocks = np.array([first.id, second.id, second.id, 0], dtype=np.int32)
+    slots = np.array([2, 2, 3, 1], dtype=np.int32)
+    n1.receive_attestations(blocks, slots)
+    assert(n1.awaited_blocks == {first.id: {0}, second.id: {1, 2}})
+
+    # a newer applied attestation drops the cached one
+    n1.set_attestation(1, 0, 2)
+    n1.receive_attestations(np.array([0, second.id, 0, 0], dtype=np.int32),
+                            np.array([-1, 1, -1, -1], dtype=np.int32))
+    assert(n1.cached_attestations == {0: (first.id, 2), 2: (second.id, 3)})
+    assert(n1.awaited_blocks == {first.id: {0}, second.id: {2}})
+
+    # the first block releases only the attestation waiting for it
+    n1.update_local_blockchain([first])
+    assert(n1.cached_attestations == {2: (second.id, 3)})
+    assert(n1.attestation_blocks.tolist() == [first.id, 0, 0, 0])
+    n1.update_local_blockchain([second])
+    assert(n1.cached_attestations == {} and n1.awaited_blocks == {})
+    assert(n1.attestation_slots.tolist() == [2, 2, 3, 1])
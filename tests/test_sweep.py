@@ -0,0 +1,107 @@
+"""Module providing Function to change path"""
+import os
+import sys
+import tempfile
+sys.path.append("../")
+import sweep
+
+
+def mock_simulation(parameters, seed):
+    return {"mainchain_rate": parameters["tau_block"], "seed_out": seed}
+
+
+def write_files(path):
+    with open(os.path.join(path, "mock.input"), "w") as f:
+        f.write("no_nodes:type=int:default=100::label=$N$:help=nodes\n")
+        f.write("tau_block:type=float:default=1.:help=block time\n")
+        f.write("network_topology:type=str:categories=[\"ER\"]::help=topology\n")
+    with open(os.path.join(path, "mock.stdout"), "w") as f:
+        f.write("mainchain_rate: help = 1-orphan rate\n")
+        f.write("seed_out: help = seed\n")
+    with open(os.path.join(path, "mock.spg"), "w") as f:
+        f.write("@execute mock.py\n")
+        f.write(":network_topology ER\n")
+        f.write(".no_nodes 10 20\n")
+        f.write("+tau_block 1 2 .5\n")
+    return os.path.join(path, "mock.spg")
+
+
+##################
+# actual testing
+
+def test_0():
+    """Parameters and seeds of the tasks
+    """
+    with tempfile.TemporaryDirectory() as path:
+        runs = sweep.Sweep(write_files(path), repeat=2, seed=5)
+        tasks = runs.tasks()
+
+    assert(len(tasks) == 2*3*2)
+    assert([t[1]["tau_block"] for t in tasks[:6]]
+           == [1.0, 1.0, 1.5, 1.5, 2.0, 2.0])
+    assert(tasks[6][1] == {"no_nodes": 20, "tau_block": 1.0,
+                           "network_topology": "ER"})
+    # seeds are distinct and do not depend on the calls
+    assert(len({t[2] for t in tasks}) == len(tasks))
+    assert(tasks == runs.tasks())
+
+
+def test_1():
+    """Runs already in the csv file are skipped
+    """
+    with tempfile.TemporaryDirectory() as path:
+        runs = sweep.Sweep(write_files(path), repeat=2, seed=5)
+        runs.run(mock_simulation, workers=1, chunksize=5)
+        with open(runs.results_path) as f:
+            lines = f.read().splitlines()
+        # a crash after 4 runs, in the middle of a line
+        with open(runs.results_path, "w") as f:
+            f.write("\n".join(lines[:5]) + "\n" + lines[5][:4])
+
+        assert(runs.done() == {int(l.split(",")[4]) for l in lines[1:5]})
+        runs.run(mock_simulation, workers=1)
+        with open(runs.results_path) as f:
+            resumed = f.read().splitlines()
+
+    assert(lines[0] == "no_nodes,tau_block,mainchain_rate,seed_out,"
+           "task,seed,wall_time,n_events,peak_memory")
+    assert(len(resumed) == len(lines) == 13)
+    # the same runs, with the same seeds
+    assert(sorted(l.split(",")[:6] for l in resumed)
+           == sorted(l.split(",")[:6] for l in lines))
+
+
+def test_2():
+    """Rows are written in blocks
+    """
+    with tempfile.TemporaryDirectory() as path:
+        file_name = os.path.join(path, "results.csv")
+        columns = ["a", "task"]
+        with sweep.CsvResultsWriter(file_name, columns, buffer_size=3,
+                                    flush_interval=1e9) as writer:
+            for i in range(4):
+                writer.write({"a": 2*i, "task": i})
+                assert(os.path.exists(file_name) == (i >= 2))
+            assert(writer.done() == {0, 1, 2})
+        assert(writer.done() == {0, 1, 2, 3})
+        with open(file_name) as f:
+            assert(f.read().splitlines() == ["a,task", "0,0", "2,1", "4,2",
+                                             "6,3"])
+
+
+def allocating_simulation(parameters, seed):
+    memory = bytearray(parameters["size"])
+    return {"n_events": len(memory)}
+
+
+def test_3():
+    """The peak memory of a run does not include the runs before it
+    """
+    chunk = [(0, {"size": 200*2**20}, 1), (1, {"size": 0}, 2)]
+    rows = sweep._run_chunk(allocating_simulation, chunk)
+    large, small = [provenance["peak_memory"] for _, _, provenance in rows]
+
+    if sys.platform.startswith("linux"):
+        assert(large - small > 150*2**20)
+    else:
+        assert(large is None and small is None)
@@ -0,0 +1,59 @@
+"""Module providing Function to change path"""
+import sys
+import tempfile
+sys.path.append("../")
+import eth_base as sample
+import topology
+import networkx as nx
+
+
+##################
+# actual testing
+
+def test_0():
+    """Cached graphs are the generated ones, with their metrics
+    """
+    parameters = {
+        'network_topology': "BA",
+        'no_nodes': 60,
+        'no_neighs': 2,
+        }
+    net_p2p = topology.generate_topology(parameters, seed=7)
+
+    with tempfile.TemporaryDirectory() as path:
+        cache = topology.TopologyCache(path)
+        first = topology.set_up_topology(parameters, seed=7, cache=cache)
+        second = topology.set_up_topology(parameters, seed=7, cache=cache)
+        other = topology.set_up_topology(parameters, seed=8, cache=cache)
+
+    assert((cache.hits, cache.misses) == (1, 2))
+    assert(sorted(first.edges()) == sorted(net_p2p.edges()))
+    assert(sorted(second.edges()) == sorted(net_p2p.edges()))
+    assert(sorted(other.edges()) != sorted(net_p2p.edges()))
+    assert(first.graph["diameter"] == nx.diameter(net_p2p))
+    assert(sample.calculate_average_shortest_path(sample.Network(second))
+           == nx.average_shortest_path_length(net_p2p))
+
+
+def test_1():
+    """A cached graph gives the same trajectory
+    """
+    parameters = {
+        'network_topology': "ER",
+        'no_nodes': 20,
+        'no_neighs': 3,
+        }
+    results = []
+    with tempfile.TemporaryDirectory() as path:
+        for cache in (None, path, path):
+            model = sample.Model(
+                graph=topology.set_up_topology(parameters, seed=1, cache=cache),
+                tau_block=5,
+                tau_attest=1,
+                delay_share=0.5,
+                delay_time=2,
+                seed=2,
+                )
+            model.run(100)
+            results.append(model.results())
+    assert(results[0] == results[1] == results[2])
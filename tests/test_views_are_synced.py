@@ -0,0 +1,30 @@
+"""Module providing Function to change path"""
+import sys
+import networkx as nx
+sys.path.append("../")
+import eth_base as sample
+
+
+##################
+# actual testing
+
+def test_0():
+    "Views are synced only once blocks and attestations reached everyone"
+    model = sample.Model(graph=nx.path_graph(3), tau_block=1, tau_attest=1,
+                         seed=0)
+    n0, n1, n2 = model.nodes
+    assert(model.views_are_synced())
+
+    n0.propose_block()
+    assert(not model.views_are_synced())
+    n0.gossip(n1)
+    n1.gossip(n2)
+    # the listeners attested the new block
+    assert(not model.views_are_synced())
+
+    for gossiper, listener in [(n1, n0), (n2, n1), (n1, n0), (n0, n1),
+                               (n1, n2)]:
+        listener.receive_attestations(gossiper.attestation_blocks,
+                                      gossiper.attestation_slots)
+    assert(model.views_are_synced())
+    assert(len(model.attestations_fingerprints) == 1)
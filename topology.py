@@ -0,0 +1,190 @@
+"""
+    copyright 2022 uzh
+    This file is part of ethereum-consensus-abm.
+
+    ethereum-consensus-abm is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    ethereum-consensus-abm is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with ethereum-consensus-abm.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import hashlib
+import os
+import tempfile
+import networkx as nx
+import numpy as np
+from eth_base import Network, calculate_diameter, calculate_average_shortest_path
+
+# parameters, besides topology, number of nodes and degree,
+# which change the graph of each topology
+TOPOLOGY_PARAMETERS = {
+    "UNIFORM": (),
+    "ER": (),
+    "BA": (),
+    "SBM": ("p_sbm_inter",),
+    "TREE": ("tree_r",),
+    }
+
+
+def generate_topology(parameters, seed=None):
+    """Generate the p2p network: the largest connected component of
+    a random graph, with nodes labelled from 0.
+    INPUT:
+    - parameters,   dict with network_topology, no_nodes, no_neighs
+                    and the parameters of the topology
+    - seed,         int, seed of the random graph, random if None
+    """
+    topology = parameters['network_topology']
+    number_of_nodes = parameters['no_nodes']
+    desired_avg_degree = parameters['no_neighs']
+    ba_m = parameters['no_neighs']
+
+    # generate network depending on topology parameter
+    if topology == "UNIFORM":
+        net_p2p = nx.random_degree_sequence_graph(
+            [desired_avg_degree for i in range(number_of_nodes)], seed=seed)
+
+    elif topology == "ER":
+        p = desired_avg_degree / (number_of_nodes - 1)
+        net_p2p = nx.fast_gnp_random_graph(number_of_nodes, p, seed=seed)
+
+    elif topology == "BA":
+        net_p2p = nx.barabasi_albert_graph(number_of_nodes, ba_m, seed=seed)
+
+    elif topology == "SBM":
+        sbm_p_inter = parameters['p_sbm_inter']
+        p_intra = desired_avg_degree/number_of_nodes*(1-sbm_p_inter)
+        p_inter = desired_avg_degree/number_of_nodes*sbm_p_inter
+        net_p2p = nx.stochastic_block_model(
+                [
+                    number_of_nodes//2,
+                    number_of_nodes//2
+                ],
+                [
+                    [p_intra, p_inter],
+                    [p_inter, p_intra]
+                ],
+                seed=seed
+                    )
+
+    elif topology == "TREE":
+        tree_r = parameters['tree_r']
+        net_p2p = nx.full_rary_tree(tree_r, number_of_nodes)
+
+    else:
+        raise ValueError("unknown network topology %r" % (topology,))
+
+    # get largest connected component
+    lcc_set = max(nx.connected_components(net_p2p), key=len)
+    net_p2p = net_p2p.subgraph(lcc_set).copy()
+    # some nodes may have been removed because they were not port of the lcc.
+    # relabel nodes so that only nodes in lcc are labelled.
+    # (without it we run into problems where node labels are higher than the
+    # number of nodes -> loops run into indexing problems)
+    net_p2p = nx.convert_node_labels_to_integers(
+        net_p2p, first_label=0)
+
+    return net_p2p
+
+
+class TopologyCache:
+    """On disk cache of the p2p networks and of their static metrics.
+    Each graph is stored in a .npz file, named after a hash of the
+    topology parameters and of the seed, with:
+    - edges,                    int32 array of shape (E, 2)
+    - degrees,                  int32 array of shape (N,)
+    - diameter,                 exact diameter
+    - average_shortest_path,    exact average shortest path length
+    Files are written atomically, so workers running the same
+    parameters at the same time can share the cache.
+    INPUT:
+    - path,     directory of the cache, created if missing
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(parameters, seed):
+        """Returns the values identifying a graph."""
+        topology = parameters['network_topology']
+        return ((topology, parameters['no_nodes'], parameters['no_neighs'])
+                + tuple(parameters[p] for p in TOPOLOGY_PARAMETERS.get(topology, ()))
+                + (seed,))
+
+    def file_name(self, parameters, seed):
+        digest = hashlib.sha256(repr(self.key(parameters, seed)).encode())
+        return os.path.join(self.path, "%s-%s.npz" % (
+            parameters['network_topology'], digest.hexdigest()[:16]))
+
+    def get(self, parameters, seed):
+        """Returns the graph of the given parameters and seed,
+        generating and storing it if it is not in the cache.
+        The static metrics are in the graph attributes,
+        where calculate_diameter and calculate_average_shortest_path
+        find them.
+        """
+        if seed is None:
+            raise ValueError("the topology cache needs a seed")
+        file_name = self.file_name(parameters, seed)
+        if os.path.exists(file_name):
+            self.hits += 1
+            return load_topology(file_name)
+        self.misses += 1
+        net_p2p = generate_topology(parameters, seed)
+        save_topology(file_name, net_p2p)
+        return load_topology(file_name)
+
+
+def save_topology(file_name, net_p2p):
+    """Store a graph with nodes labelled from 0 and its static metrics."""
+    net = Network(net_p2p)
+    edges = np.array(list(net_p2p.edges()), dtype=np.int32).reshape(-1, 2)
+    degrees = np.array([d for _, d in net_p2p.degree()], dtype=np.int32)
+    directory = os.path.dirname(file_name) or "."
+    with tempfile.NamedTemporaryFile(dir=directory, suffix=".npz",
+                                     delete=False) as tmp:
+        np.savez(tmp,
+                 edges=edges,
+                 degrees=degrees,
+                 diameter=calculate_diameter(net),
+                 average_shortest_path=calculate_average_shortest_path(net))
+    os.replace(tmp.name, file_name)
+
+
+def load_topology(file_name):
+    """Load a graph stored with save_topology."""
+    with np.load(file_name) as data:
+        net_p2p = nx.Graph()
+        net_p2p.add_nodes_from(range(len(data["degrees"])))
+        net_p2p.add_edges_from(data["edges"].tolist())
+        net_p2p.graph["degrees"] = data["degrees"]
+        net_p2p.graph["diameter"] = int(data["diameter"])
+        net_p2p.graph["average_shortest_path"] = float(
+            data["average_shortest_path"])
+    return net_p2p
+
+
+def set_up_topology(parameters, seed=None, cache=None):
+    """Returns the p2p network of the given parameters.
+    INPUT:
+    - parameters,   dict, see generate_topology
+    - seed,         int, seed of the random graph, random if None
+    - cache,        TopologyCache object, or path of its directory;
+                    if given, seed is required
+    """
+    if cache is None:
+        return generate_topology(parameters, seed)
+    if not isinstance(cache, TopologyCache):
+        cache = TopologyCache(cache)
+    return cache.get(parameters, seed)